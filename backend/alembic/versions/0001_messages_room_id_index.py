@@ -0,0 +1,33 @@
+"""Composite (room, id) index for keyset pagination of message history
+
+Tables themselves are still created by ``Base.metadata.create_all`` on
+startup, which also creates this index on fresh databases; the migration
+builds it on existing ones. On PostgreSQL it is built CONCURRENTLY so the
+messages table stays writable.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('messages'):
+        return  # fresh database: create_all builds the table with its index
+    if op.get_context().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.create_index('ix_messages_room_id', 'messages', ['org_id', 'id'],
+                            if_not_exists=True, postgresql_concurrently=True)
+    else:
+        op.create_index('ix_messages_room_id', 'messages', ['org_id', 'id'], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_messages_room_id', table_name='messages', if_exists=True)
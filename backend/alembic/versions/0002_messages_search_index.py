@@ -0,0 +1,44 @@
+"""Full-text search index on messages.content
+
+SQLite: FTS5 table plus sync triggers. PostgreSQL: stored tsvector column
+and a GIN index, built CONCURRENTLY. The app also creates these on startup
+(``search_service.ensure_index``); this migration is for large existing
+tables, where the PostgreSQL index build should not block writes.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.services import search_service
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('messages'):
+        return  # fresh database: created on startup
+    dialect = op.get_context().dialect.name
+    if dialect == 'postgresql':
+        for ddl in search_service.POSTGRES_DDL:
+            op.execute(ddl)
+        with op.get_context().autocommit_block():
+            op.execute(search_service.POSTGRES_INDEX.format(concurrently='CONCURRENTLY'))
+    elif dialect == 'sqlite':
+        search_service.ensure_index(op.get_bind())
+
+
+def downgrade():
+    dialect = op.get_context().dialect.name
+    if dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_messages_content_tsv')
+        op.execute('ALTER TABLE messages DROP COLUMN IF EXISTS content_tsv')
+    elif dialect == 'sqlite':
+        for trigger in ('messages_fts_insert', 'messages_fts_delete', 'messages_fts_update'):
+            op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        op.execute('DROP TABLE IF EXISTS messages_fts')
@@ -0,0 +1,41 @@
+"""Composite indexes for task listing with filters and keyset pagination
+
+``GET /api/v1/tasks`` lists non-archived tasks newest first (by id),
+optionally for one assignee or status, or a due date range. Created by
+``create_all`` on fresh databases; built CONCURRENTLY on PostgreSQL.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    'ix_tasks_archived_id': ['archived', 'id'],
+    'ix_tasks_assigned_archived_id': ['assigned_to', 'archived', 'id'],
+    'ix_tasks_status_archived_id': ['status', 'archived', 'id'],
+    'ix_tasks_archived_due_date': ['archived', 'due_date'],
+}
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('tasks'):
+        return  # fresh database: create_all builds the table with its indexes
+    if op.get_context().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, columns in INDEXES.items():
+                op.create_index(name, 'tasks', columns, if_not_exists=True, postgresql_concurrently=True)
+    else:
+        for name, columns in INDEXES.items():
+            op.create_index(name, 'tasks', columns, if_not_exists=True)
+
+
+def downgrade():
+    for name in INDEXES:
+        op.drop_index(name, table_name='tasks', if_exists=True)
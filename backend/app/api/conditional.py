@@ -0,0 +1,19 @@
+"""Conditional GET: ETags from collection versions, 304 on If-None-Match."""
+from typing import Optional
+
+from fastapi import Request, Response
+
+
+def not_modified(request: Request, response: Response, version: str) -> Optional[Response]:
+    """Set ``ETag`` for ``version`` on ``response``; if the client already has
+    it, return the 304 to send instead (before any list query runs)."""
+    etag = f'W/"{version}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    response.headers.update(headers)
+    match = request.headers.get("If-None-Match")
+    if match:
+        tags = {tag.strip() for tag in match.split(",")}
+        # Weak comparison: W/"x" and "x" match
+        if "*" in tags or etag in tags or etag[2:] in tags:
+            return Response(status_code=304, headers=headers)
+    return None
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from ..db import SessionLocal
 from ..models import User
 from ..core.security import decode_token
+from ..services.user_service import get_identity
 
 def get_db():
     db = SessionLocal()
@@ -25,7 +26,8 @@ def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
     if payload.get("type") != "access":
         raise HTTPException(status_code=401, detail="Invalid token type")
     user_id = payload.get("id")
-    user = db.query(User).filter(User.id == user_id).first()
+    # Cached identity: no DB round trip for users seen within the TTL
+    user = get_identity(db, user_id)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     return user
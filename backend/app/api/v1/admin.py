@@ -1,13 +1,33 @@
 """Admin API endpoints."""
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from pydantic import BaseModel
-from typing import Optional
+from typing import Iterator, Optional
 from datetime import datetime, timedelta
+from functools import partial
+import anyio
+import json
+import zlib
 
+from ..conditional import not_modified
 from ..deps import get_db, get_current_user, require_admin
-from ...models import User, Task, Message, Attachment, PushSubscription
+from ...db import SessionLocal
+from ...models import User, Task, Message, Attachment, PushSubscription, ReadMarker
+from ...realtime.loopmonitor import loop_monitor
+from ...realtime.persistence import socket_db
+from ...realtime.presence import presence
+from ...realtime.typing_indicators import typing_tracker
+from ...realtime.outbound import outbound
+from ...realtime.history import room_history
+from ...realtime.unread import unread_tracker
+from ...services.user_service import identity_cache, invalidate_identity, invalidate_username, username_cache
+from ...services import message_service, sync_service
+from ...services.message_service import first_page_cache
+from ...services.push_service import push_sender
+from ...sockets import (message_writer, outbox_dispatcher, push_coalescer, reminder_scheduler,
+                        signal_identity_invalidated)
 
 router = APIRouter(prefix="/api/v1/admin", tags=["admin"])
 
@@ -20,11 +40,18 @@ class UserUpdate(BaseModel):
 # -- Stats --
 @router.get("/stats")
 def get_stats(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     _: User = Depends(require_admin),
 ):
-    """Get dashboard statistics."""
+    """Get dashboard statistics (304 for a matching If-None-Match)."""
     now = datetime.utcnow()
+    # Weekly counts also move with time: the ETag changes at least every minute
+    version = sync_service.collection_version(db, "user", "task", "message", "attachment", "push_subscription")
+    cached = not_modified(request, response, f"{version}-{now:%Y%m%d%H%M}")
+    if cached is not None:
+        return cached
     week_ago = now - timedelta(days=7)
     
     # Users
@@ -75,6 +102,36 @@ def get_stats(
     }
 
 
+@router.get("/realtime")
+def get_realtime_stats(_: User = Depends(require_admin)):
+    """Socket.IO internals: loop blocking, DB pool, batching, presence, typing, send queues, replay, unread, outbox, reminders, Web Push, push coalescing."""
+    return {
+        "handlers": loop_monitor.snapshot(),
+        "socket_db_workers": socket_db.max_workers,
+        "message_writer": message_writer.snapshot(),
+        "presence": presence.snapshot(),
+        "typing": typing_tracker.snapshot(),
+        "outbound": outbound.snapshot(),
+        "room_history": room_history.snapshot(),
+        "unread": unread_tracker.snapshot(),
+        "outbox": outbox_dispatcher.snapshot(),
+        "reminders": reminder_scheduler.snapshot(),
+        "push": push_sender.snapshot(),
+        "push_coalescer": push_coalescer.snapshot(),
+    }
+
+
+@router.get("/caches")
+def get_cache_stats(_: User = Depends(require_admin)):
+    """Hit/miss counters of the in-process caches."""
+    return {
+        "identity": identity_cache.stats(),
+        "username": username_cache.stats(),
+        "message_first_page": first_page_cache.stats(),
+        "vapid": push_sender.vapid_cache.stats(),
+    }
+
+
 # -- Users Management --
 @router.get("/users")
 def list_users(
@@ -143,6 +200,9 @@ def update_user(
         ).decode()
     
     db.commit()
+    invalidate_identity(user_id)
+    # Other workers drop their cached copy on the signal
+    anyio.from_thread.run(partial(signal_identity_invalidated, user_id))
     return {"detail": "User updated"}
 
 
@@ -162,10 +222,17 @@ def delete_user(
     
     # Delete user's push subscriptions
     db.query(PushSubscription).filter(PushSubscription.user_id == user_id).delete()
+    db.query(ReadMarker).filter(ReadMarker.user_id == user_id).delete()
     
     # Note: Messages and tasks remain for history
     db.delete(user)
     db.commit()
+    invalidate_identity(user_id)
+    # Their messages now render as "deleted"
+    invalidate_username(user_id)
+    first_page_cache.clear()
+    unread_tracker.forget_user(user_id)
+    anyio.from_thread.run(partial(signal_identity_invalidated, user_id, deleted=True))
     
     return {"detail": "User deleted"}
 
@@ -232,12 +299,51 @@ def broadcast_message(
     current_user: User = Depends(require_admin),
 ):
     """Send broadcast message to all users (creates system message)."""
-    msg = Message(
-        sender=current_user.id,
+    msg = message_service.create_message(
+        db,
+        sender_id=current_user.id,
         content=f"📢 {body.message}",
-        org_id='general',
+        room='general',
     )
-    db.add(msg)
-    db.commit()
     
     return {"detail": "Broadcast sent", "message_id": msg.id}
+
+
+# -- Export --
+def _history_ndjson(room: str, after_id: Optional[int]) -> Iterator[bytes]:
+    # Own session: the response body is produced after the request's dependencies exit
+    db = SessionLocal()
+    try:
+        for rows in message_service.iter_history(db, room, after_id):
+            yield "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows).encode()
+    finally:
+        db.close()
+
+
+def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@router.get("/messages/export")
+def export_messages(
+    room: str = Query("general"),
+    after_id: Optional[int] = Query(None, description="Resume after this message id (the last line received)"),
+    gzip: bool = Query(False, description="gzip-compress the NDJSON"),
+    _: User = Depends(require_admin),
+):
+    """Stream a room's full history as NDJSON, one message per line in id order."""
+    body = _history_ndjson(room, after_id)
+    filename = "messages-" + "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in room) + ".ndjson"
+    if gzip:
+        body = _gzip(body)
+        filename += ".gz"
+    return StreamingResponse(
+        body,
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
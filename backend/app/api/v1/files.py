@@ -1,5 +1,5 @@
 """File attachment API endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Request, Response
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from typing import Optional
@@ -7,9 +7,11 @@ import os
 import uuid
 import shutil
 
+from ..conditional import not_modified
 from ..deps import get_db, get_current_user
 from ...models import User, Attachment
 from ...core.config import UPLOAD_FOLDER
+from ...services import sync_service
 
 router = APIRouter(prefix="/api/v1/files", tags=["files"])
 
@@ -201,10 +203,15 @@ def get_message_attachments(
 @router.get("/task/{task_id}")
 def get_task_attachments(
     task_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Get all attachments for a task."""
+    """Get all attachments for a task (304 for a matching If-None-Match)."""
+    cached = not_modified(request, response, sync_service.collection_version(db, "attachment"))
+    if cached is not None:
+        return cached
     attachments = db.query(Attachment).filter(
         Attachment.task_id == task_id
     ).all()
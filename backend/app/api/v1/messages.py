@@ -1,37 +1,77 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import Optional
+from datetime import datetime
 
+from ..conditional import not_modified
 from ..deps import get_db, get_current_user
 from ...models import User
-from ...schemas.message import MessageCreate, MessageOut
-from ...services import message_service
+from ...schemas.message import MessageCreate, MessageOut, MessageSearchOut
+from ...services import message_service, search_service, sync_service
 
 router = APIRouter(prefix="/api/v1/messages", tags=["messages"])
 
 
 @router.get("", response_model=list[MessageOut])
 def get_messages(
+    request: Request,
+    response: Response,
     room: str = Query("general", description="Chat room name"),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
     before_id: Optional[int] = Query(None, description="For pagination: get messages before this ID"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Get messages from a room with pagination."""
+    """Get messages from a room, newest page first.
+
+    Older pages: pass the ``X-Next-Cursor`` response header back as ``cursor``;
+    the header is absent on the last page. Send the ``ETag`` back as
+    ``If-None-Match`` to get a 304 while no message has changed.
+    """
+    # Users too: a deleted sender shows as "deleted"
+    cached = not_modified(request, response, sync_service.collection_version(db, "message", "user"))
+    if cached is not None:
+        return cached
+    if cursor is not None:
+        try:
+            before_id = message_service.decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if before_id is None:
+        rows = message_service.get_latest_page(db, room=room, limit=limit)
+        if len(rows) == limit:
+            response.headers["X-Next-Cursor"] = message_service.encode_cursor(rows[0]["id"])
+        return rows
     messages = message_service.get_messages(db, room=room, limit=limit, before_id=before_id)
-    return [
-        MessageOut(
-            id=m.id,
-            sender_id=m.sender_id,
-            sender_username=m.sender.username if m.sender else "deleted",
-            content=m.content,
-            room=m.room,
-            reply_to=m.reply_to,
-            created_at=m.created_at,
+    if len(messages) == limit:
+        response.headers["X-Next-Cursor"] = message_service.encode_cursor(messages[0].id)
+    return message_service.to_payloads(db, messages)
+
+
+@router.get("/search", response_model=MessageSearchOut)
+def search_messages(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find; the last one (3+ letters) also matches as a prefix"),
+    room: Optional[str] = Query(None),
+    sender_id: Optional[int] = Query(None),
+    since: Optional[datetime] = Query(None, description="Only messages created at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only messages created before this time"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Full-text search in messages, best matches first."""
+    if not search_service.supported(db):
+        raise HTTPException(status_code=501, detail="Message search needs SQLite or PostgreSQL")
+    try:
+        items, next_cursor = search_service.search_messages(
+            db, q, room=room, sender_id=sender_id, since=since, until=until,
+            limit=limit, cursor=cursor,
         )
-        for m in messages
-    ]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
 
 
 @router.post("", response_model=MessageOut)
@@ -48,6 +88,7 @@ def create_message(
         room=body.room,
         reply_to=body.reply_to,
     )
+    # The outbox emits new_message once the message is committed
     return MessageOut(
         id=msg.id,
         sender_id=msg.sender_id,
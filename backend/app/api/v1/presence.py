@@ -0,0 +1,18 @@
+"""Presence API endpoints."""
+from fastapi import APIRouter, Depends
+
+from ..deps import get_current_user
+from ...models import User
+from ...realtime.presence import presence
+
+router = APIRouter(prefix="/api/v1/presence", tags=["presence"])
+
+
+@router.get("")
+def get_online_users(current_user: User = Depends(get_current_user)):
+    """List users with at least one connected socket (on any worker of this host)."""
+    online = presence.online()
+    return [
+        {"user_id": user_id, "username": username}
+        for user_id, username in sorted(online.items())
+    ]
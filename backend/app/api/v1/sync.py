@@ -0,0 +1,37 @@
+"""Delta sync API: changes to messages, tasks and attachments since a cursor."""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from ..deps import get_db, get_current_user
+from ...models import User
+from ...services import sync_service
+
+router = APIRouter(prefix="/api/v1/sync", tags=["sync"])
+
+
+@router.get("")
+def get_changes(
+    cursor: Optional[str] = Query(None, description="cursor of the previous response; omit to start from the beginning"),
+    limit: int = Query(500, ge=1, le=1000, description="Max changes per page"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Messages, tasks and attachments created, updated or deleted after ``cursor``.
+
+    Each entity appears once, in its current state or as a deleted id.
+    Repeat with the returned ``cursor`` while ``more`` is true.
+    """
+    try:
+        return sync_service.changes_since(db, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/head")
+def get_head(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Cursor of the newest change; take it before loading full lists."""
+    return {"cursor": sync_service.head(db)}
@@ -1,33 +1,53 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import Optional
 from datetime import datetime
 
+from ..conditional import not_modified
 from ..deps import get_db, get_current_user, require_admin
 from ...models import User
-from ...schemas.task import TaskCreate, TaskUpdate, TaskOut
-from ...services import task_service
+from ...schemas.task import TaskCreate, TaskUpdate, TaskBulkUpdate, TaskOut
+from ...services import sync_service, task_service
 
 router = APIRouter(prefix="/api/v1/tasks", tags=["tasks"])
 
 
 @router.get("", response_model=list[TaskOut])
 def get_tasks(
+    request: Request,
+    response: Response,
     assigned_to: Optional[int] = Query(None, description="Filter by assigned user ID"),
     status: Optional[str] = Query(None, description="Filter by status: open, in_progress, done"),
     date_from: Optional[datetime] = Query(None, description="Due date from"),
     date_to: Optional[datetime] = Query(None, description="Due date to"),
     limit: int = Query(50, ge=1, le=100),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    offset: int = Query(0, ge=0, description="Deprecated, use cursor"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """List tasks with optional filters."""
+    """List tasks with optional filters, newest first.
+
+    Next pages: pass the ``X-Next-Cursor`` response header back as ``cursor``
+    with the same filters; the header is absent on the last page. Send the
+    ``ETag`` back as ``If-None-Match`` to get a 304 while no task has changed.
+    """
+    cached = not_modified(request, response, sync_service.collection_version(db, "task"))
+    if cached is not None:
+        return cached
+    before_id = None
+    if cursor is not None:
+        try:
+            before_id = task_service.decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     tasks = task_service.list_tasks(
         db, assigned_to=assigned_to, status=status,
         date_from=date_from, date_to=date_to,
-        limit=limit, offset=offset
+        limit=limit, offset=offset if cursor is None else 0, before_id=before_id,
     )
+    if len(tasks) == limit:
+        response.headers["X-Next-Cursor"] = task_service.encode_cursor(tasks[-1].id)
     return tasks
 
 
@@ -92,10 +112,45 @@ def update_task(
         assigned_to=body.assigned_to,
         title=body.title,
         description=body.description,
+        actor_id=current_user.id,
     )
     return task
 
 
+@router.post("/bulk")
+def bulk_update_tasks(
+    body: TaskBulkUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Change status, assignee or archived flag of many tasks at once.
+    Same rules as updating one task, checked for every id before anything
+    changes: admins can change anything, assigned users only the status of
+    their own tasks. Sends one ``tasks_updated`` event and one push per
+    affected assignee.
+    """
+    status = body.status.value if body.status else None
+    if status is None and body.assigned_to is None and body.archived is None:
+        raise HTTPException(status_code=400, detail="Nothing to update")
+    task_ids = sorted(set(body.ids))
+    # Archived tasks can only be addressed to restore them
+    tasks = task_service.get_tasks_brief(db, task_ids, include_archived=body.archived is not None)
+    missing = sorted(set(task_ids) - {t.id for t in tasks})
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Tasks not found: {missing}")
+
+    if not current_user.is_admin:
+        if body.assigned_to is not None or body.archived is not None:
+            raise HTTPException(status_code=403, detail="Only admins can update task details")
+        if any(t.assigned_to != current_user.id for t in tasks):
+            raise HTTPException(status_code=403, detail="Can only update your assigned tasks")
+
+    task_service.update_tasks(db, tasks, status=status, assigned_to=body.assigned_to,
+                              archived=body.archived, actor_id=current_user.id)
+    return {"updated": task_ids}
+
+
 @router.delete("/{task_id}")
 def delete_task(
     task_id: int,
@@ -0,0 +1,42 @@
+"""Unread counts and read markers."""
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from functools import partial
+import anyio
+
+from ..deps import get_db, get_current_user
+from ...models import User
+from ...realtime.unread import unread_tracker
+from ...sockets import emit_read
+
+router = APIRouter(prefix="/api/v1/unread", tags=["unread"])
+
+
+class MarkRead(BaseModel):
+    room: str = "general"
+    message_id: int
+
+
+@router.get("")
+def get_unread(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Unread count and read position of every room the user has read."""
+    counts = unread_tracker.counts(db, current_user.id)
+    return [{"room": room, **marker} for room, marker in counts.items()]
+
+
+@router.post("/read")
+def mark_read(
+    body: MarkRead,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Mark a room read up to ``message_id`` (same as the ``mark_read`` socket event)."""
+    last_read_id, unread = unread_tracker.mark_read(db, current_user.id, body.room, body.message_id)
+    # No flush loop without socket traffic on this worker: save this marker now
+    unread_tracker.flush(db, current_user.id, body.room)
+    anyio.from_thread.run(partial(emit_read, current_user.id, body.room, last_read_id, unread))
+    return {"room": body.room, "last_read_id": last_read_id, "unread": unread}
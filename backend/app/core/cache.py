@@ -0,0 +1,223 @@
+"""Small in-process caches shared by request handlers."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class LRUCache:
+    """Thread-safe LRU cache with an optional per-entry TTL and hit/miss counters.
+
+    Sync FastAPI routes run in a thread pool, hence the lock.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at and expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl else 0.0
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class PageCache:
+    """Newest ``page_size`` rows per key (ordered by ``id``) within a byte budget.
+
+    Rows are dicts with an ``id``. ``add``/``remove`` keep cached pages
+    current; least recently read keys are evicted once the estimated size
+    exceeds ``max_bytes``, and a page older than ``ttl`` seconds is reloaded
+    in case a write was missed. A page loaded by ``fill`` is only installed
+    if no write touched its key since ``version(key)`` was read before the
+    query, so a racing write cannot leave a hole in it. Versions are only
+    kept for keys that are cached or being filled.
+    """
+
+    def __init__(self, page_size: int, max_bytes: int, sizeof=None, ttl: float | None = None):
+        self.page_size = page_size
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda row: 64 * len(row))
+        self.ttl = ttl
+        # key -> [rows, complete, bytes, loaded_at]; complete = the key has no older rows
+        self._pages: OrderedDict[Hashable, list] = OrderedDict()
+        self._versions: dict[Hashable, int] = {}
+        self._filling: dict[Hashable, int] = {}
+        self._clock = 0
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._pages
+
+    def version(self, key: Hashable) -> int:
+        """Read before querying a page; pass to ``fill`` (or ``abandon``)."""
+        with self._lock:
+            self._filling[key] = self._filling.get(key, 0) + 1
+            return self._versions.get(key, 0)
+
+    def get(self, key: Hashable, limit: int) -> list[dict] | None:
+        """The newest ``limit`` rows, oldest first, or None if not cached."""
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None and self.ttl and time.monotonic() - page[3] > self.ttl:
+                self._drop(key)
+                self.expired += 1
+                page = None
+            if page is None or limit > self.page_size or (len(page[0]) < limit and not page[1]):
+                self.misses += 1
+                return None
+            self._pages.move_to_end(key)
+            self.hits += 1
+            return page[0][-limit:]
+
+    def fill(self, key: Hashable, rows: list[dict], version: int) -> None:
+        """Install a freshly queried page (newest rows, oldest first)."""
+        rows = rows[-self.page_size:]
+        with self._lock:
+            self._release(key)
+            if self._versions.get(key, 0) != version:
+                self._forget(key)
+                return
+            self._drop(key)
+            size = sum(self.sizeof(row) for row in rows)
+            self._pages[key] = [rows, len(rows) < self.page_size, size, time.monotonic()]
+            self._versions.setdefault(key, 0)
+            self.bytes += size
+            self._shrink()
+
+    def abandon(self, key: Hashable) -> None:
+        """The query after ``version(key)`` failed: nothing to fill."""
+        with self._lock:
+            self._release(key)
+            self._forget(key)
+
+    def _bump(self, key: Hashable) -> None:
+        self._clock += 1
+        if key in self._pages or key in self._filling:
+            self._versions[key] = self._clock
+
+    def add(self, key: Hashable, row: dict) -> None:
+        with self._lock:
+            self._bump(key)
+            page = self._pages.get(key)
+            if page is None:
+                return
+            rows = page[0]
+            if rows and row['id'] <= rows[-1]['id']:
+                pos = next(i for i, r in enumerate(rows) if r['id'] >= row['id'])
+                if rows[pos]['id'] == row['id']:
+                    return
+                if pos == 0 and not page[1] and len(rows) >= self.page_size:
+                    return  # older than the cached page
+                rows.insert(pos, row)
+            else:
+                rows.append(row)
+            page[2] += self.sizeof(row)
+            self.bytes += self.sizeof(row)
+            if len(rows) > self.page_size:
+                old = rows.pop(0)
+                page[1] = False
+                page[2] -= self.sizeof(old)
+                self.bytes -= self.sizeof(old)
+            self._shrink()
+
+    def remove(self, key: Hashable, row_id: int) -> None:
+        """Forget a deleted row; the page is refilled on the next read."""
+        with self._lock:
+            self._bump(key)
+            page = self._pages.get(key)
+            if page is not None and any(r['id'] == row_id for r in page[0]):
+                self._drop(key)
+
+    def _release(self, key: Hashable) -> None:
+        count = self._filling.get(key, 0) - 1
+        if count > 0:
+            self._filling[key] = count
+        else:
+            self._filling.pop(key, None)
+
+    def _forget(self, key: Hashable) -> None:
+        # No page and no fill in flight: nobody compares this version any more
+        if key not in self._pages and key not in self._filling:
+            self._versions.pop(key, None)
+
+    def _drop(self, key: Hashable) -> None:
+        page = self._pages.pop(key, None)
+        if page is not None:
+            self.bytes -= page[2]
+            self._forget(key)
+
+    def _shrink(self) -> None:
+        while self.bytes > self.max_bytes and self._pages:
+            key, page = self._pages.popitem(last=False)
+            self.bytes -= page[2]
+            self.evictions += 1
+            self._forget(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pages.clear()
+            self.bytes = 0
+            self._versions = {key: version for key, version in self._versions.items() if key in self._filling}
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'keys': len(self._pages),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'page_size': self.page_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            'evictions': self.evictions,
+            'expired': self.expired,
+            'versions': len(self._versions),
+        }
@@ -9,3 +9,91 @@ ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', '/app/archives')
 VAPID_PUBLIC_KEY = os.getenv('VAPID_PUBLIC_KEY', '')
 VAPID_PRIVATE_KEY = os.getenv('VAPID_PRIVATE_KEY', '')
 VAPID_CLAIMS_EMAIL = os.getenv('VAPID_CLAIMS_EMAIL', 'admin@example.com')
+
+# Socket.IO fan-out between workers/hosts.
+# Empty = single process; unix:///path = local broker; redis://... or amqp://... = shared queue
+SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE', '')
+SOCKETIO_CHANNEL = os.getenv('SOCKETIO_CHANNEL', 'team-messenger')
+
+# Socket handler DB pool size and the loop-blocking time that gets logged per handler call
+SOCKET_DB_WORKERS = int(os.getenv('SOCKET_DB_WORKERS', '4'))
+SOCKET_BLOCK_WARN_MS = float(os.getenv('SOCKET_BLOCK_WARN_MS', '20'))
+
+# Write-behind batching of chat messages: flush after this many ms or this many messages
+MESSAGE_FLUSH_MS = float(os.getenv('MESSAGE_FLUSH_MS', '5'))
+MESSAGE_BATCH_MAX = int(os.getenv('MESSAGE_BATCH_MAX', '200'))
+
+# Presence: diff broadcast interval, and a directory shared by the workers of one host
+# (empty = this process only)
+PRESENCE_INTERVAL_MS = float(os.getenv('PRESENCE_INTERVAL_MS', '1000'))
+PRESENCE_DIR = os.getenv('PRESENCE_DIR', '')
+
+# Typing indicators: at most one room_typing update per room per interval; typers expire after the TTL
+TYPING_INTERVAL_MS = float(os.getenv('TYPING_INTERVAL_MS', '500'))
+TYPING_TTL_MS = float(os.getenv('TYPING_TTL_MS', '3000'))
+
+# Authenticated identity cache (user_id -> id/username/role)
+IDENTITY_CACHE_SIZE = int(os.getenv('IDENTITY_CACHE_SIZE', '10000'))
+IDENTITY_CACHE_TTL = float(os.getenv('IDENTITY_CACHE_TTL', '60'))
+# user_id -> username for message lists, replay and exports
+USERNAME_CACHE_SIZE = int(os.getenv('USERNAME_CACHE_SIZE', '50000'))
+
+# Per-connection outbound queue limits; on overflow 'drop' sheds typing/presence first, 'disconnect' evicts
+SOCKET_QUEUE_MAX_BYTES = int(os.getenv('SOCKET_QUEUE_MAX_BYTES', str(1024 * 1024)))
+SOCKET_QUEUE_MAX_PACKETS = int(os.getenv('SOCKET_QUEUE_MAX_PACKETS', '1000'))
+SOCKET_OVERFLOW_POLICY = os.getenv('SOCKET_OVERFLOW_POLICY', 'drop')
+# Reaper: disconnect sockets whose queue made no progress / that sent nothing (0 = never) for this many seconds
+SOCKET_STALL_TIMEOUT = float(os.getenv('SOCKET_STALL_TIMEOUT', '60'))
+SOCKET_IDLE_TIMEOUT = float(os.getenv('SOCKET_IDLE_TIMEOUT', '0'))
+SOCKET_REAP_INTERVAL = float(os.getenv('SOCKET_REAP_INTERVAL', '15'))
+
+# Reconnect resume: recent messages kept per room, and the most a DB fallback replays
+ROOM_HISTORY_SIZE = int(os.getenv('ROOM_HISTORY_SIZE', '500'))
+REPLAY_MAX = int(os.getenv('REPLAY_MAX', '1000'))
+
+# GET /api/v1/messages first page: newest rows kept per room, and the memory budget across rooms
+MESSAGE_PAGE_SIZE = int(os.getenv('MESSAGE_PAGE_SIZE', '100'))
+MESSAGE_PAGE_CACHE_BYTES = int(os.getenv('MESSAGE_PAGE_CACHE_BYTES', str(8 * 1024 * 1024)))
+# ... reloaded after this many seconds even if no write was seen (safety net for missed broadcasts)
+MESSAGE_PAGE_TTL_S = float(os.getenv('MESSAGE_PAGE_TTL_S', '30'))
+
+# Message search ranks the newest this-many matches of a query
+SEARCH_RANK_WINDOW = int(os.getenv('SEARCH_RANK_WINDOW', '10000'))
+
+# Unread counters are kept in memory; changed read markers are written back every this many ms,
+# for at most this many rooms (least recently used rooms are dropped and reloaded when needed)
+UNREAD_FLUSH_MS = float(os.getenv('UNREAD_FLUSH_MS', '5000'))
+UNREAD_MAX_ROOMS = int(os.getenv('UNREAD_MAX_ROOMS', '10000'))
+
+# Transactional outbox: dispatcher poll interval (it is also woken on commit), batch size,
+# claim lease, delivery attempts, and threads sending its pushes
+OUTBOX_POLL_MS = float(os.getenv('OUTBOX_POLL_MS', '1000'))
+OUTBOX_BATCH = int(os.getenv('OUTBOX_BATCH', '200'))
+OUTBOX_LEASE_S = float(os.getenv('OUTBOX_LEASE_S', '30'))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '10'))
+OUTBOX_PUSH_WORKERS = int(os.getenv('OUTBOX_PUSH_WORKERS', '4'))
+
+# Due-date reminders: fire this many minutes before a task is due; on startup,
+# reminders missed within the catch-up window are still sent
+REMINDER_LEAD_MINUTES = float(os.getenv('REMINDER_LEAD_MINUTES', '0'))
+REMINDER_CATCHUP_MINUTES = float(os.getenv('REMINDER_CATCHUP_MINUTES', '60'))
+
+# Web Push delivery: pushes in flight, keep-alive connections per push service, per-push
+# timeout, and the TTL push services keep a push for an offline device (0 = drop)
+PUSH_CONCURRENCY = int(os.getenv('PUSH_CONCURRENCY', '100'))
+PUSH_CONNECTIONS_PER_HOST = int(os.getenv('PUSH_CONNECTIONS_PER_HOST', '20'))
+PUSH_TIMEOUT_S = float(os.getenv('PUSH_TIMEOUT_S', '10'))
+PUSH_TTL_S = int(os.getenv('PUSH_TTL_S', '0'))
+# VAPID tokens: lifetime (push services accept at most 24 h), and how long before expiry
+# the token cached per push service origin is re-signed
+VAPID_TOKEN_TTL_S = float(os.getenv('VAPID_TOKEN_TTL_S', str(12 * 60 * 60)))
+VAPID_REFRESH_S = float(os.getenv('VAPID_REFRESH_S', str(60 * 60)))
+
+# Push coalescing: per notification type (push_service.notify_<type>), ms to hold a user's pushes
+# and send them as one; types not listed are sent right away. Format: type=ms,type=ms
+PUSH_COALESCE_MS = {
+    name.strip(): float(ms)
+    for name, _, ms in (item.partition('=') for item in
+                        os.getenv('PUSH_COALESCE_MS', 'new_message=5000,task_updated=3000').split(','))
+    if name.strip() and ms
+}
@@ -1,5 +1,6 @@
 """Team Messenger - FastAPI + Socket.IO Backend"""
 from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 import socketio
 import os
@@ -7,6 +8,7 @@ import shutil
 
 from .db import engine, Base, SessionLocal
 from .core.config import UPLOAD_FOLDER
+from .core.metrics import registry
 from .models import User
 from .crud import create_user
 
@@ -17,12 +19,28 @@ from .api.v1.messages import router as messages_router
 from .api.v1.push import router as push_router
 from .api.v1.files import router as files_router
 from .api.v1.admin import router as admin_router
+from .api.v1.presence import router as presence_router
+from .api.v1.unread import router as unread_router
+from .api.v1.sync import router as sync_router
 
 # Import Socket.IO instance
-from .sockets import sio
-
-# Create database tables
+from .sockets import sio, message_writer, outbox_dispatcher, push_coalescer, reminder_scheduler, wait_chat_pushes
+from .realtime.persistence import socket_db
+from .realtime.presence import presence
+from .realtime.typing_indicators import typing_tracker
+from .realtime.outbound import outbound
+from .realtime.history import room_history
+from .realtime.unread import unread_tracker
+from .services.user_service import identity_cache, username_cache
+from .services.message_service import first_page_cache
+from .services.push_service import push_sender
+from .services import search_service, sync_service
+
+# Create database tables, the message search index and the change feed triggers
 Base.metadata.create_all(bind=engine)
+with engine.begin() as conn:
+    search_service.ensure_index(conn)
+    sync_service.ensure_triggers(conn)
 
 # FastAPI app
 app = FastAPI(title='Team Messenger', version='0.0.5')
@@ -34,6 +52,9 @@ app.include_router(messages_router)
 app.include_router(push_router)
 app.include_router(files_router)
 app.include_router(admin_router)
+app.include_router(presence_router)
+app.include_router(unread_router)
+app.include_router(sync_router)
 
 # CORS middleware
 app.add_middleware(
@@ -42,6 +63,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 
@@ -63,6 +85,48 @@ def health():
     return {'status': 'ok'}
 
 
+@registry.collector
+def _realtime_gauges():
+    queues = outbound.snapshot(top=0)
+    yield 'socketio_connections', 'Connected Engine.IO sockets.', {}, queues['connections']
+    yield 'socketio_queued_bytes', 'Bytes waiting in outbound socket queues.', {}, queues['queued_bytes']
+    yield 'socketio_queued_packets', 'Packets waiting in outbound socket queues.', {}, queues['queued_packets']
+    yield 'socketio_dropped_packets', 'Packets shed by full outbound queues.', {}, queues['dropped_packets']
+    yield 'socketio_evictions', 'Sockets disconnected for queue overflow.', {}, queues['evictions']
+    yield 'socketio_online_users', 'Users online on this host.', {}, presence.snapshot()['online_users']
+    yield 'typing_active_rooms', 'Rooms with someone typing on this worker.', {}, len(typing_tracker.rooms)
+    writer = message_writer.snapshot()
+    for name in ('pending', 'messages', 'batches', 'failed'):
+        yield 'socketio_message_writer', 'Write-behind buffer and totals.', {'stat': name}, writer[name]
+    for name, value in room_history.snapshot().items():
+        yield 'socketio_room_history', 'Reconnect replay buffer lookups and size.', {'stat': name}, value
+    for name, value in outbox_dispatcher.snapshot().items():
+        yield 'outbox_dispatcher', 'Outbox deliveries, retries and lag.', {'stat': name}, value
+    for name, value in push_sender.snapshot().items():
+        yield 'push_sender', 'Web Push deliveries, failures and pooled connections.', {'stat': name}, value
+    for name, value in push_coalescer.snapshot().items():
+        yield 'push_coalescer', 'Pushes held per user and merged: requested, sent, saved.', {'stat': name}, value
+    for name, value in reminder_scheduler.snapshot().items():
+        if value is not None:
+            yield 'task_reminders', 'Due-date reminders: pending, fired, skipped.', {'stat': name}, value
+    for name, value in unread_tracker.snapshot().items():
+        yield 'unread_tracker', 'Unread counters: loaded rooms and markers, counted messages, writes.', {'stat': name}, value
+    for name, value in identity_cache.stats().items():
+        yield 'cache_stat', 'In-process cache counters.', {'cache': 'identity', 'stat': name}, value
+    for name, value in username_cache.stats().items():
+        yield 'cache_stat', 'In-process cache counters.', {'cache': 'username', 'stat': name}, value
+    for name, value in first_page_cache.stats().items():
+        yield 'cache_stat', 'In-process cache counters.', {'cache': 'message_first_page', 'stat': name}, value
+    for name, value in push_sender.vapid_cache.stats().items():
+        yield 'cache_stat', 'In-process cache counters.', {'cache': 'vapid', 'stat': name}, value
+
+
+@app.get('/metrics', response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint (values are per worker process)."""
+    return PlainTextResponse(registry.render(), media_type='text/plain; version=0.0.4')
+
+
 @app.on_event('startup')
 def on_startup():
     """Create admin user on startup if configured."""
@@ -79,6 +143,40 @@ def on_startup():
             db.close()
 
 
+@app.on_event('startup')
+async def start_broadcast_listener():
+    """Listen to the message queue from startup, not from the first socket:
+    a worker that has only served REST requests still has to hear what the
+    other workers publish (signals, and with them cache invalidations)."""
+    if not sio.manager_initialized:
+        sio.manager_initialized = True
+        sio.manager.initialize()
+
+
+@app.on_event('startup')
+async def start_outbox():
+    """REST writes need the outbox drained even without socket traffic;
+    due-date reminders are timed from startup."""
+    outbox_dispatcher.start()
+    reminder_scheduler.start()
+
+
+@app.on_event('shutdown')
+async def on_shutdown():
+    """Flush buffered messages, the outbox, held pushes and read markers, then close the push and socket DB pools."""
+    await presence.stop()
+    await typing_tracker.stop_loop()
+    await outbound.stop()
+    await message_writer.close()
+    await reminder_scheduler.stop()
+    await outbox_dispatcher.stop()
+    await wait_chat_pushes()
+    await push_coalescer.stop()
+    push_sender.close()
+    await unread_tracker.stop(socket_db.run)
+    socket_db.shutdown()
+
+
 # Mount Socket.IO on top of FastAPI ASGI app
 socket_app = socketio.ASGIApp(sio, other_asgi_app=app)
 
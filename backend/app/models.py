@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Enum, Boolean
+from sqlalchemy import Column, Integer, BigInteger, Float, String, Text, ForeignKey, DateTime, Enum, Boolean, Index, UniqueConstraint, JSON
+from sqlalchemy.orm import synonym
 from sqlalchemy.sql import func
 from .db import Base
 import enum
@@ -15,6 +16,10 @@ class User(Base):
     role = Column(String(32), default='user')
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    @property
+    def is_admin(self) -> bool:
+        return self.role == 'admin'
+
 class Task(Base):
     __tablename__ = 'tasks'
     id = Column(Integer, primary_key=True, index=True)
@@ -28,14 +33,30 @@ class Task(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # Task listing: newest first (id order) per filter, see migration 0003
+    __table_args__ = (
+        Index('ix_tasks_archived_id', 'archived', 'id'),
+        Index('ix_tasks_assigned_archived_id', 'assigned_to', 'archived', 'id'),
+        Index('ix_tasks_status_archived_id', 'status', 'archived', 'id'),
+        Index('ix_tasks_archived_due_date', 'archived', 'due_date'),
+    )
+
 class Message(Base):
     __tablename__ = 'messages'
     id = Column(Integer, primary_key=True, index=True)
     sender = Column(Integer, ForeignKey('users.id'))
     content = Column(Text)
-    org_id = Column(String(128), nullable=True)
+    org_id = Column(String(128), nullable=True)  # chat room name
+    reply_to = Column(Integer, ForeignKey('messages.id'), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # Names used by the service layer and API schemas
+    sender_id = synonym('sender')
+    room = synonym('org_id')
+
+    # History is paged per room by id (keyset); see migration 0001
+    __table_args__ = (Index('ix_messages_room_id', 'org_id', 'id'),)
+
 class PushSubscription(Base):
     __tablename__ = 'push_subscriptions'
     id = Column(Integer, primary_key=True, index=True)
@@ -58,3 +79,76 @@ class Attachment(Base):
     size = Column(Integer)  # bytes
     mime_type = Column(String(128))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ReadMarker(Base):
+    """How far a user has read a room; ``unread`` is as of ``counted_through``."""
+    __tablename__ = 'read_markers'
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    room = Column(String(128), primary_key=True)
+    last_read_id = Column(Integer, nullable=False, default=0)
+    unread = Column(Integer, nullable=False, default=0)
+    # Newest message id already reflected in ``unread``
+    counted_through = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (Index('ix_read_markers_room', 'room'),)
+
+
+class Change(Base):
+    """Change feed: the latest change to each message, task and attachment
+    (plus users and push subscriptions, for collection versions only).
+
+    Written by database triggers (see ``sync_service``); a row moves to a new
+    ``seq`` every time its entity changes, so the table holds one row per
+    entity, deletes included (tombstones).
+    """
+    __tablename__ = 'changes'
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    entity = Column(String(16), nullable=False)  # message, task, attachment
+    entity_id = Column(Integer, nullable=False)
+    op = Column(String(8), nullable=False)  # upsert, delete
+    # Writing transaction on PostgreSQL (0 on SQLite), see sync_service
+    txid = Column(BigInteger, nullable=False, server_default='0')
+    changed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('entity', 'entity_id', name='uq_changes_entity'),
+        Index('ix_changes_txid_seq', 'txid', 'seq'),
+        Index('ix_changes_entity_txid_seq', 'entity', 'txid', 'seq'),
+        # Never reuse a seq on SQLite, not even after the newest row moves
+        {'sqlite_autoincrement': True},
+    )
+
+
+class OutboxEvent(Base):
+    """Socket event or push to send once the transaction that wrote it commits.
+
+    Rows are added in the same transaction as the change they announce and
+    deleted by the dispatcher (``realtime.outbox``) after delivery; the id is
+    the dedup id clients see as ``event_id``.
+    """
+    __tablename__ = 'outbox'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String(8), nullable=False)  # emit, push
+    event = Column(String(64), nullable=False)  # socket event / push_service.notify_* name
+    room = Column(String(128), nullable=True)  # emit target, None = everyone
+    payload = Column(JSON, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    # Unix time from which the row may be claimed (leases and retry backoff)
+    available_at = Column(Float, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('ix_outbox_available_at', 'available_at', 'id'),
+        # Ids are dedup ids: never reuse one on SQLite once its row is deleted
+        {'sqlite_autoincrement': True},
+    )
+
+
+class TaskReminder(Base):
+    """A due-date reminder that has been sent; the key makes it once per due date."""
+    __tablename__ = 'task_reminders'
+    task_id = Column(Integer, ForeignKey('tasks.id', ondelete='CASCADE'), primary_key=True)
+    due_date = Column(DateTime, primary_key=True)
+    fired_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1 @@
+# realtime package
@@ -0,0 +1,119 @@
+"""Encode-once broadcast path for Socket.IO emits."""
+from engineio import packet as eio_packet
+from socketio import packet
+from socketio.asyncio_manager import AsyncManager
+from socketio.asyncio_pubsub_manager import AsyncPubSubManager
+
+from ..core.metrics import registry
+from .outbound import DROPPABLE_EVENTS
+from .signals import SignalMixin
+
+emit_recipients = registry.histogram(
+    'socketio_emit_recipients', 'Local recipients per broadcast.', ('event',),
+    buckets=(0, 1, 2, 5, 10, 50, 100, 500, 1000, 5000, 10000))
+emit_bytes = registry.counter(
+    'socketio_emit_bytes_total', 'Bytes enqueued to local sockets by broadcasts.', ('event',))
+
+
+class BroadcastMixin:
+    """Client manager mixin that encodes an event once and enqueues the very
+    same Engine.IO packet on every recipient socket.
+
+    The stock manager creates one task and one ``send_packet`` coroutine per
+    recipient; here delivery is a plain loop of ``put_nowait`` calls on the
+    sockets' outbound queues. With a pub/sub backend the encoded packet is
+    published as-is, so receiving workers skip JSON encoding as well.
+    Emits with callbacks or binary attachments take the stock path.
+
+    ``tap(event, fn)`` calls ``fn(data)`` on every worker for each emit of
+    ``event``; the raw data then travels with the encoded packet.
+    """
+    taps: dict = {}
+
+    def tap(self, event: str, fn) -> None:
+        self.taps = {**self.taps, event: fn}
+
+    def _run_tap(self, event, data):
+        fn = self.taps.get(event)
+        if fn is not None:
+            try:
+                fn(data)
+            except Exception as e:
+                print(f"[Socket.IO] Tap for {event} failed: {e}")
+
+    def encode_event(self, event: str, data, namespace: str) -> list[str] | None:
+        """Encode an event into Socket.IO packet strings (None if binary)."""
+        if isinstance(data, tuple):
+            data = list(data)
+        elif data is not None:
+            data = [data]
+        else:
+            data = []
+        pkt = self.server.packet_class(packet.EVENT, namespace=namespace, data=[event] + data)
+        encoded = pkt.encode()
+        if isinstance(encoded, list):
+            return None
+        return [encoded]
+
+    def deliver(self, encoded: list[str], namespace: str, room=None, skip_sid=None,
+                droppable: bool = False, event: str = '') -> int:
+        """Enqueue pre-encoded packets for local recipients; returns their number.
+
+        ``droppable`` packets may be shed by a full outbound queue.
+        """
+        if namespace not in self.rooms:
+            return 0
+        if not isinstance(skip_sid, list):
+            skip_sid = [skip_sid]
+        eio_pkts = [eio_packet.Packet(eio_packet.MESSAGE, p) for p in encoded]
+        if droppable:
+            for p in eio_pkts:
+                p.droppable = True
+        sockets = self.server.eio.sockets
+        recipients = 0
+        for sid, eio_sid in self.get_participants(namespace, room):
+            if sid in skip_sid:
+                continue
+            socket = sockets.get(eio_sid)
+            if socket is None or socket.closed or socket.closing:
+                continue
+            for p in eio_pkts:
+                socket.queue.put_nowait(p)
+            recipients += 1
+        emit_recipients.observe(recipients, event)
+        if recipients:
+            emit_bytes.inc(event, amount=recipients * sum(len(p) for p in encoded))
+        return recipients
+
+    async def emit(self, event, data, namespace=None, room=None, skip_sid=None,
+                   callback=None, **kwargs):
+        namespace = namespace or '/'
+        encoded = self.encode_event(event, data, namespace) if callback is None else None
+        if encoded is None:
+            return await super().emit(event, data, namespace=namespace, room=room,
+                                      skip_sid=skip_sid, callback=callback, **kwargs)
+        if isinstance(self, AsyncPubSubManager) and not kwargs.get('ignore_queue'):
+            tapped = data if event in self.taps else None
+            await self._publish({'method': 'emit', 'event': event, 'data': tapped,
+                                 'encoded': encoded, 'namespace': namespace,
+                                 'room': room, 'skip_sid': skip_sid,
+                                 'callback': None, 'host_id': self.host_id})
+            return
+        self._run_tap(event, data)
+        self.deliver(encoded, namespace, room=room, skip_sid=skip_sid,
+                     droppable=event in DROPPABLE_EVENTS, event=event)
+
+    async def _handle_emit(self, message):
+        encoded = message.get('encoded')
+        if encoded is None:
+            return await super()._handle_emit(message)
+        if message.get('data') is not None:
+            self._run_tap(message.get('event'), message['data'])
+        self.deliver(encoded, message.get('namespace') or '/',
+                     room=message.get('room'), skip_sid=message.get('skip_sid'),
+                     droppable=message.get('event') in DROPPABLE_EVENTS,
+                     event=message.get('event') or '')
+
+
+class BroadcastManager(BroadcastMixin, SignalMixin, AsyncManager):
+    """In-process client manager with the encode-once broadcast path."""
@@ -0,0 +1,93 @@
+"""Recent messages per room, for replaying what a reconnecting client missed."""
+import bisect
+import itertools
+from collections import deque
+
+from ..core.config import ROOM_HISTORY_SIZE
+
+
+class RoomBuffer:
+    """The newest messages of one room, ordered by id.
+
+    Holds every message of the room with ``id >= complete_from``: the buffer
+    starts empty when the first message is seen and, once full, raises
+    ``complete_from`` past each message it evicts.
+    """
+    __slots__ = ('ids', 'payloads', 'complete_from')
+
+    def __init__(self, first_id: int):
+        self.ids: deque[int] = deque()
+        self.payloads: deque[dict] = deque()
+        self.complete_from = first_id
+
+
+class RoomHistory:
+    """Per-room ring buffers of ``new_message`` payloads.
+
+    Fed with every ``new_message`` broadcast (through the client manager, so
+    each worker sees messages written by all of them). ``since(room, id)``
+    answers from memory when the buffer covers the gap and returns ``None``
+    otherwise, so the caller can fall back to the database.
+    """
+
+    def __init__(self, size: int = ROOM_HISTORY_SIZE):
+        self.size = size
+        self.rooms: dict[str, RoomBuffer] = {}
+        self.stats = {'hits': 0, 'misses': 0, 'replayed': 0}
+
+    def add(self, payload: dict) -> None:
+        if not self.size:
+            return
+        room, msg_id = payload['room'], payload['id']
+        buf = self.rooms.get(room)
+        if buf is None:
+            buf = self.rooms[room] = RoomBuffer(msg_id)
+        if msg_id < buf.complete_from:
+            return  # older than what the buffer vouches for
+        if not buf.ids or msg_id > buf.ids[-1]:
+            buf.ids.append(msg_id)
+            buf.payloads.append(payload)
+        else:
+            # Concurrent writers may commit out of id order
+            pos = bisect.bisect_left(buf.ids, msg_id)
+            if pos < len(buf.ids) and buf.ids[pos] == msg_id:
+                return
+            buf.ids.insert(pos, msg_id)
+            buf.payloads.insert(pos, payload)
+        if len(buf.ids) > self.size:
+            buf.complete_from = buf.ids.popleft() + 1
+            buf.payloads.popleft()
+
+    def remove(self, room: str, msg_id: int) -> None:
+        buf = self.rooms.get(room)
+        if buf is None:
+            return
+        pos = bisect.bisect_left(buf.ids, msg_id)
+        if pos < len(buf.ids) and buf.ids[pos] == msg_id:
+            del buf.ids[pos]
+            del buf.payloads[pos]
+
+    def since(self, room: str, last_seen_id: int) -> list[dict] | None:
+        """Messages of ``room`` after ``last_seen_id``, or None if not all are buffered."""
+        buf = self.rooms.get(room)
+        if buf is None or last_seen_id + 1 < buf.complete_from:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        pos = bisect.bisect_right(buf.ids, last_seen_id)
+        missed = list(itertools.islice(buf.payloads, pos, None))
+        self.stats['replayed'] += len(missed)
+        return missed
+
+    def snapshot(self) -> dict:
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'hit_rate': round(self.stats['hits'] / lookups, 4) if lookups else 0.0,
+            'rooms': len(self.rooms),
+            'buffered': sum(len(buf.ids) for buf in self.rooms.values()),
+            'size': self.size,
+        }
+
+
+room_history = RoomHistory()
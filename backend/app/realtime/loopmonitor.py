@@ -0,0 +1,117 @@
+"""Per-handler accounting of time spent blocking the asyncio event loop."""
+import contextvars
+import functools
+import time
+from typing import Any, Awaitable, Callable
+
+from ..core.config import SOCKET_BLOCK_WARN_MS
+from ..core.metrics import registry
+
+# Name of the Socket.IO handler running in the current task, for attributing DB time
+current_handler: contextvars.ContextVar[str] = contextvars.ContextVar('current_handler', default='background')
+
+handler_seconds = registry.histogram(
+    'socketio_handler_seconds', 'Wall-clock latency of Socket.IO event handlers.', ('event',))
+handler_blocked_seconds = registry.histogram(
+    'socketio_handler_blocked_seconds', 'Time a handler held the event loop.', ('event',))
+handler_exceptions = registry.counter(
+    'socketio_handler_exceptions_total', 'Exceptions raised by Socket.IO event handlers.',
+    ('event', 'exception'))
+
+
+class HandlerStats:
+    __slots__ = ('calls', 'blocked_total', 'blocked_max', 'slow_calls')
+
+    def __init__(self):
+        self.calls = 0
+        self.blocked_total = 0.0
+        self.blocked_max = 0.0
+        self.slow_calls = 0
+
+    def as_dict(self) -> dict:
+        return {
+            'calls': self.calls,
+            'blocked_total_ms': round(self.blocked_total * 1000, 3),
+            'blocked_avg_ms': round(self.blocked_total * 1000 / self.calls, 3) if self.calls else 0.0,
+            'blocked_max_ms': round(self.blocked_max * 1000, 3),
+            'slow_calls': self.slow_calls,
+        }
+
+
+class _TimedAwait:
+    """Drive a coroutine step by step, summing the time of each step.
+
+    A step is the synchronous run between two awaits, i.e. exactly the time
+    the loop could not serve anything else.
+    """
+    __slots__ = ('coro', 'blocked')
+
+    def __init__(self, coro):
+        self.coro = coro
+        self.blocked = 0.0
+
+    def __await__(self):
+        coro = self.coro
+        value, error = None, None
+        while True:
+            started = time.perf_counter()
+            try:
+                if error is not None:
+                    future = coro.throw(error)
+                else:
+                    future = coro.send(value)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.blocked += time.perf_counter() - started
+            try:
+                value, error = (yield future), None
+            except BaseException as exc:  # delivered into the coroutine on next step
+                value, error = None, exc
+
+
+class LoopMonitor:
+    """Collects loop-blocking time for wrapped coroutine functions.
+
+    Also records wall latency, blocking time and exceptions per handler in the
+    metrics registry.
+    """
+
+    def __init__(self, warn_after: float = SOCKET_BLOCK_WARN_MS / 1000):
+        self.warn_after = warn_after
+        self.handlers: dict[str, HandlerStats] = {}
+
+    def track(self, fn: Callable[..., Awaitable[Any]]):
+        """Decorator for ``async def`` handlers; keeps the function name for ``@sio.event``."""
+        name = fn.__name__
+        stats = self.handlers.setdefault(name, HandlerStats())
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            token = current_handler.set(name)
+            started = time.perf_counter()
+            timed = _TimedAwait(fn(*args, **kwargs))
+            try:
+                return await timed
+            except Exception as exc:
+                handler_exceptions.inc(name, type(exc).__name__)
+                raise
+            finally:
+                current_handler.reset(token)
+                handler_seconds.observe(time.perf_counter() - started, name)
+                handler_blocked_seconds.observe(timed.blocked, name)
+                stats.calls += 1
+                stats.blocked_total += timed.blocked
+                if timed.blocked > stats.blocked_max:
+                    stats.blocked_max = timed.blocked
+                if timed.blocked > self.warn_after:
+                    stats.slow_calls += 1
+                    print(f"[Socket.IO] Handler {name} blocked the loop for {timed.blocked * 1000:.1f}ms")
+
+        return wrapper
+
+    def snapshot(self) -> dict:
+        return {name: stats.as_dict() for name, stats in self.handlers.items()}
+
+
+loop_monitor = LoopMonitor()
@@ -0,0 +1,200 @@
+"""Bounded per-connection outbound queues, slow-consumer eviction and reaping."""
+import asyncio
+import time
+
+from ..core.config import (
+    SOCKET_QUEUE_MAX_BYTES, SOCKET_QUEUE_MAX_PACKETS, SOCKET_OVERFLOW_POLICY,
+    SOCKET_STALL_TIMEOUT, SOCKET_IDLE_TIMEOUT, SOCKET_REAP_INTERVAL,
+)
+
+# Ephemeral events a client can afford to miss; shed first under pressure
+DROPPABLE_EVENTS = frozenset({'room_typing', 'presence_diff'})
+
+
+def packet_size(pkt) -> int:
+    """Bytes an Engine.IO packet will take on the wire (encoding is cached)."""
+    if pkt is None:
+        return 0
+    if pkt.binary:
+        return len(pkt.data)  # don't cache a non-base64 encoding for polling clients
+    return len(pkt.encode())
+
+
+class OutboundQueue(asyncio.Queue):
+    """The Engine.IO socket's send queue, with byte and packet limits.
+
+    On overflow with the ``drop`` policy, queued droppable packets (typing,
+    presence) are discarded first and a droppable incoming packet is refused;
+    anything else that still does not fit gets the client disconnected, as it
+    does right away under the ``disconnect`` policy. ``None`` (Engine.IO's
+    shutdown sentinel) is always accepted.
+    """
+
+    def __init__(self, limits: 'OutboundRegistry'):
+        super().__init__()
+        self.limits = limits
+        self.bytes = 0
+        self.dropped = 0
+        self.evicted = False
+        self.last_progress = time.monotonic()
+
+    def _put(self, item):
+        if not self._queue:
+            self.last_progress = time.monotonic()
+        self.bytes += packet_size(item)
+        super()._put(item)
+
+    def _get(self):
+        item = super()._get()
+        self.bytes -= packet_size(item)
+        self.last_progress = time.monotonic()
+        return item
+
+    def _fits(self, size: int) -> bool:
+        return (self.bytes + size <= self.limits.max_bytes
+                and len(self._queue) < self.limits.max_packets)
+
+    def _discard(self, keep) -> int:
+        """Remove queued packets for which ``keep`` is false, keeping join() consistent."""
+        kept = [item for item in self._queue if keep(item)]
+        removed = len(self._queue) - len(kept)
+        if removed:
+            self._queue.clear()
+            self._queue.extend(kept)
+            self.bytes = sum(packet_size(item) for item in kept)
+            self._unfinished_tasks -= removed
+            if self._unfinished_tasks == 0:
+                self._finished.set()
+        return removed
+
+    def put_nowait(self, item):
+        if item is None:
+            return super().put_nowait(item)
+        if self.evicted:
+            self.dropped += 1
+            return
+        size = packet_size(item)
+        if not self._fits(size):
+            if self.limits.policy == 'drop':
+                self.dropped += self._discard(lambda p: not getattr(p, 'droppable', False))
+                if getattr(item, 'droppable', False) and not self._fits(size):
+                    self.dropped += 1
+                    return
+            if not self._fits(size):
+                self.dropped += 1 + self._discard(lambda p: p is None)
+                self.evicted = True
+                self.limits.evict(self)
+                return
+        super().put_nowait(item)
+
+
+class OutboundRegistry:
+    """Installs ``OutboundQueue`` on an Engine.IO server and reaps connections.
+
+    The reaper disconnects sockets whose queue has made no progress for
+    ``stall_timeout`` seconds and, if ``idle_timeout`` is set, sockets that
+    sent no event for that long.
+    """
+
+    def __init__(self, max_bytes: int = SOCKET_QUEUE_MAX_BYTES,
+                 max_packets: int = SOCKET_QUEUE_MAX_PACKETS,
+                 policy: str = SOCKET_OVERFLOW_POLICY,
+                 stall_timeout: float = SOCKET_STALL_TIMEOUT,
+                 idle_timeout: float = SOCKET_IDLE_TIMEOUT,
+                 reap_interval: float = SOCKET_REAP_INTERVAL):
+        if policy not in ('drop', 'disconnect'):
+            raise ValueError(f'Unknown SOCKET_OVERFLOW_POLICY: {policy}')
+        self.max_bytes = max_bytes
+        self.max_packets = max_packets
+        self.policy = policy
+        self.stall_timeout = stall_timeout
+        self.idle_timeout = idle_timeout
+        self.reap_interval = reap_interval
+        self.eio = None
+        self.last_seen = None  # callable eio_sid -> monotonic time of last client event
+        self.evictions = 0
+        self.reaped = 0
+        self._task: asyncio.Task | None = None
+
+    def attach(self, eio):
+        """Make every socket of ``eio`` use a bounded queue."""
+        self.eio = eio
+        eio.create_queue = lambda *args, **kwargs: OutboundQueue(self)
+
+    def _eio_sid(self, queue: OutboundQueue) -> str | None:
+        for eio_sid, socket in self.eio.sockets.items():
+            if socket.queue is queue:
+                return eio_sid
+        return None
+
+    def _disconnect(self, eio_sid: str, reason: str):
+        print(f"[Socket.IO] Disconnecting {eio_sid}: {reason}")
+        asyncio.get_running_loop().create_task(self.eio.disconnect(eio_sid))
+
+    def evict(self, queue: OutboundQueue):
+        self.evictions += 1
+        eio_sid = self._eio_sid(queue)
+        if eio_sid is not None:
+            self._disconnect(eio_sid, 'outbound queue overflow')
+
+    def reap(self, now: float | None = None) -> int:
+        """Disconnect stalled (and idle) sockets; returns how many."""
+        now = time.monotonic() if now is None else now
+        reaped = 0
+        for eio_sid, socket in list(self.eio.sockets.items()):
+            queue = socket.queue
+            if socket.closed or socket.closing or not isinstance(queue, OutboundQueue):
+                continue
+            if queue.qsize() and now - queue.last_progress > self.stall_timeout:
+                self._disconnect(eio_sid, 'outbound queue stalled')
+                reaped += 1
+            elif self.idle_timeout and self.last_seen is not None:
+                seen = self.last_seen(eio_sid)
+                if seen is not None and now - seen > self.idle_timeout:
+                    self._disconnect(eio_sid, 'idle')
+                    reaped += 1
+        self.reaped += reaped
+        return reaped
+
+    def start(self):
+        """Start the reaper once (needs a running event loop)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.reap_interval)
+            try:
+                self.reap()
+            except Exception as e:
+                print(f"[Socket.IO] Reaper failed: {e}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def snapshot(self, top: int = 10) -> dict:
+        """Queue depth and queued bytes, totals and the largest connections."""
+        rows = []
+        if self.eio is not None:
+            for eio_sid, socket in self.eio.sockets.items():
+                queue = socket.queue
+                if isinstance(queue, OutboundQueue):
+                    rows.append((queue.bytes, queue.qsize(), queue.dropped, eio_sid))
+        rows.sort(reverse=True)
+        return {
+            'connections': len(rows),
+            'queued_bytes': sum(r[0] for r in rows),
+            'queued_packets': sum(r[1] for r in rows),
+            'dropped_packets': sum(r[2] for r in rows),
+            'evictions': self.evictions,
+            'reaped': self.reaped,
+            'limits': {'max_bytes': self.max_bytes, 'max_packets': self.max_packets,
+                       'policy': self.policy},
+            'largest': [{'eio_sid': sid, 'queued_bytes': b, 'queued_packets': n, 'dropped': d}
+                        for b, n, d, sid in rows[:top]],
+        }
+
+
+outbound = OutboundRegistry()
@@ -0,0 +1,164 @@
+"""Dispatcher for the transactional outbox: socket events and pushes after commit."""
+import asyncio
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timezone
+from typing import Awaitable, Callable
+
+from ..core.config import (OUTBOX_BATCH, OUTBOX_LEASE_S, OUTBOX_MAX_ATTEMPTS,
+                           OUTBOX_POLL_MS, OUTBOX_PUSH_WORKERS)
+from ..services import outbox_service, push_service
+from .persistence import SocketDB
+
+
+class OutboxDispatcher:
+    """Drains the ``outbox`` table in batches.
+
+    Woken right after a commit that wrote outbox rows on this worker, and
+    polls every ``interval`` for rows written elsewhere or left behind by a
+    crashed worker. Each batch is leased, emitted in id order, its pushes
+    sent on a small thread pool (never on the socket DB pool), then deleted.
+
+    Delivery is at least once: a batch whose delete is lost comes back after
+    the lease. Every emitted payload carries ``event_id`` (the row id) so
+    clients can drop repeats; this worker also remembers recent ids and does
+    not send them twice.
+
+    Pushes of types the ``coalescer`` holds back are handed to it instead
+    of being sent here (and leave the outbox at that point).
+    """
+
+    def __init__(self, db: SocketDB, emit: Callable[..., Awaitable],
+                 batch: int = OUTBOX_BATCH, interval: float = OUTBOX_POLL_MS / 1000,
+                 lease: float = OUTBOX_LEASE_S, max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+                 push_workers: int = OUTBOX_PUSH_WORKERS, coalescer=None):
+        self.db = db
+        self.coalescer = coalescer
+        self.emit = emit
+        self.batch = batch
+        self.interval = interval
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self._push_executor = ThreadPoolExecutor(push_workers, thread_name_prefix='outbox-push')
+        self._sent: OrderedDict[int, None] = OrderedDict()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+        self.stats = {'emitted': 0, 'pushed': 0, 'coalesced': 0, 'batches': 0, 'failed': 0,
+                      'dropped': 0, 'duplicates': 0, 'last_lag_ms': 0.0}
+        outbox_service.commit_hooks.append(self.notify)
+
+    def start(self):
+        """Start the drain loop once (needs a running event loop)."""
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def notify(self):
+        """Wake the loop; safe to call from any thread."""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                while await self.drain() == self.batch:
+                    pass
+            except Exception as e:
+                print(f"[Outbox] Drain failed: {e}")
+
+    async def drain(self) -> int:
+        """Dispatch one batch; returns how many rows were claimed."""
+        rows = await self.db.run(outbox_service.claim, self.batch, self.lease)
+        if not rows:
+            return 0
+        done, failed, pushes = [], [], []
+        for row in rows:
+            if row.id in self._sent:
+                self.stats['duplicates'] += 1
+                done.append(row.id)
+            elif row.kind == 'push' and self.coalescer is not None and self.coalescer.window(row.event):
+                self.coalescer.add(row.event, row.payload)
+                done.append(row.id)
+                self.stats['coalesced'] += 1
+            elif row.kind == 'push':
+                pushes.append(row)
+            else:
+                try:
+                    await self.emit(row.event, {**row.payload, 'event_id': row.id}, room=row.room)
+                    self._remember(row.id)
+                    done.append(row.id)
+                    self.stats['emitted'] += 1
+                except Exception as e:
+                    print(f"[Outbox] Emit {row.event} #{row.id} failed: {e}")
+                    failed.append(row)
+        if pushes:
+            loop = asyncio.get_running_loop()
+            results = await asyncio.gather(
+                *(loop.run_in_executor(self._push_executor, self._push, row) for row in pushes),
+                return_exceptions=True)
+            for row, result in zip(pushes, results):
+                if isinstance(result, BaseException):
+                    print(f"[Outbox] Push {row.event} #{row.id} failed: {result}")
+                    failed.append(row)
+                else:
+                    self._remember(row.id)
+                    done.append(row.id)
+                    self.stats['pushed'] += 1
+        await self.db.run(outbox_service.complete, done)
+        if failed:
+            self.stats['failed'] += len(failed)
+            dropped = await self.db.run(outbox_service.retry, failed, self.max_attempts)
+            self.stats['dropped'] += len(dropped)
+            if dropped:
+                print(f"[Outbox] Gave up on {dropped} after {self.max_attempts} attempts")
+        self.stats['batches'] += 1
+        created = rows[0].created_at
+        if created is not None:
+            if created.tzinfo is None:
+                created = created.replace(tzinfo=timezone.utc)  # SQLite CURRENT_TIMESTAMP is UTC
+            self.stats['last_lag_ms'] = round((time.time() - created.timestamp()) * 1000, 1)
+        return len(rows)
+
+    def _push(self, row):
+        db = self.db.Session()
+        try:
+            getattr(push_service, f'notify_{row.event}')(db, **row.payload)
+        finally:
+            db.close()
+
+    def _remember(self, row_id: int):
+        self._sent[row_id] = None
+        if len(self._sent) > 10 * self.batch:
+            self._sent.popitem(last=False)
+
+    async def stop(self):
+        """Stop the loop after one last drain."""
+        if self._task is not None:
+            task, self._task = self._task, None
+            # Let a drain in progress finish rather than cancel it: a batch
+            # cut off after its claim would stay leased, so the final drain
+            # below could not see it
+            self._stopping = True
+            self._wakeup.set()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            try:
+                await self.drain()
+            except Exception as e:
+                print(f"[Outbox] Final drain failed: {e}")
+        self._push_executor.shutdown(wait=True)
+
+    def snapshot(self) -> dict:
+        return {**self.stats, 'batch': self.batch, 'poll_interval_ms': self.interval * 1000}
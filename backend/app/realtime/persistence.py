@@ -0,0 +1,62 @@
+"""Database access for Socket.IO handlers without blocking the event loop."""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..core.config import DATABASE_URL, SOCKET_DB_WORKERS
+from ..core.metrics import registry
+from .loopmonitor import current_handler
+
+db_seconds = registry.histogram(
+    'socketio_handler_db_seconds',
+    'Time socket handlers waited on the DB pool (queueing plus query).', ('event',))
+
+
+class SocketDB:
+    """Bounded thread pool with its own connection pool for socket handlers.
+
+    Handlers ``await socket_db.run(fn, ...)``; ``fn(db, ...)`` runs on one of
+    ``max_workers`` threads with a fresh session, so a slow query or commit
+    only holds a worker thread, never the loop. The engine is separate from
+    the REST one so socket traffic cannot starve request handlers of
+    connections (and vice versa).
+    """
+
+    def __init__(self, url: str = DATABASE_URL, max_workers: int = SOCKET_DB_WORKERS):
+        if url.startswith('sqlite'):
+            engine_args = {'connect_args': {'check_same_thread': False}}
+        else:
+            engine_args = {'pool_size': max_workers, 'max_overflow': 0, 'pool_pre_ping': True}
+        self.engine = create_engine(url, **engine_args)
+        # Objects returned from run() outlive the session, keep them loaded
+        self.Session = sessionmaker(bind=self.engine, autocommit=False, autoflush=False,
+                                    expire_on_commit=False)
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='socket-db')
+
+    def _call(self, fn: Callable[..., Any], args, kwargs):
+        db: Session = self.Session()
+        try:
+            return fn(db, *args, **kwargs)
+        finally:
+            db.close()
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run ``fn(db, *args, **kwargs)`` in the DB pool and await its result."""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._executor, self._call, fn, args, kwargs)
+        finally:
+            db_seconds.observe(time.perf_counter() - started, current_handler.get())
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+        self.engine.dispose()
+
+
+socket_db = SocketDB()
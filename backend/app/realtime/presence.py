@@ -0,0 +1,178 @@
+"""Who is online: per-user socket sets, shared between workers on one host."""
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import Awaitable, Callable
+
+from ..core.config import PRESENCE_DIR, PRESENCE_INTERVAL_MS
+
+
+class SocketSession:
+    """One connected socket (a browser tab)."""
+    __slots__ = ('sid', 'user_id', 'username', 'connected_at', 'last_seen')
+
+    def __init__(self, sid: str, user_id: int, username: str):
+        self.sid = sid
+        self.user_id = user_id
+        self.username = username
+        self.connected_at = time.time()
+        self.last_seen = time.monotonic()  # last event received from the client
+
+
+class PresenceRegistry:
+    """Tracks sockets per user and publishes presence as periodic diffs.
+
+    A user is online while at least one of their sockets is connected on any
+    worker, so extra tabs do not produce events. Each tick the registry
+    compares the host-wide online set with the previous one and emits a single
+    ``presence_diff`` to its own sockets; every worker does the same, so each
+    client hears about a change exactly once.
+
+    With ``directory`` set, each worker writes its local ``{user_id: username}``
+    map to ``<directory>/<pid>-<rand>.json`` and reads the other workers' files.
+    Files not refreshed for a few ticks belong to dead workers and are ignored.
+    """
+
+    def __init__(self, directory: str = PRESENCE_DIR,
+                 interval: float = PRESENCE_INTERVAL_MS / 1000):
+        self.directory = directory
+        self.interval = interval
+        self.stale_after = max(interval * 5, 5.0)
+        self.sessions: dict[str, SocketSession] = {}
+        self.by_user: dict[int, set[str]] = {}
+        self._usernames: dict[int, str] = {}
+        self._published: dict[int, str] = {}
+        self._dirty = True
+        self._task: asyncio.Task | None = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.path = os.path.join(directory, f'{os.getpid()}-{uuid.uuid4().hex[:8]}.json')
+
+    # -- local sockets --
+    def add(self, sid: str, user_id: int, username: str) -> bool:
+        """Register a socket; True if it is the user's first one on this worker."""
+        self.sessions[sid] = SocketSession(sid, user_id, username)
+        sids = self.by_user.setdefault(user_id, set())
+        sids.add(sid)
+        if len(sids) == 1:
+            self._usernames[user_id] = username
+            self._dirty = True
+            return True
+        return False
+
+    def remove(self, sid: str) -> SocketSession | None:
+        session = self.sessions.pop(sid, None)
+        if session is None:
+            return None
+        sids = self.by_user.get(session.user_id)
+        if sids is not None:
+            sids.discard(sid)
+            if not sids:
+                del self.by_user[session.user_id]
+                del self._usernames[session.user_id]
+                self._dirty = True
+        return session
+
+    def user_id(self, sid: str) -> int | None:
+        session = self.sessions.get(sid)
+        return session.user_id if session else None
+
+    def touch(self, sid: str) -> SocketSession | None:
+        """Note client activity on ``sid``."""
+        session = self.sessions.get(sid)
+        if session is not None:
+            session.last_seen = time.monotonic()
+        return session
+
+    def sids(self, user_id: int) -> set[str]:
+        return self.by_user.get(user_id, set())
+
+    def is_online(self, user_id: int) -> bool:
+        """Connected here, or anywhere on the host as of the last tick."""
+        return user_id in self._usernames or user_id in self._published
+
+    # -- host-wide view --
+    def _write_local(self):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self._usernames, f)
+        os.replace(tmp, self.path)
+
+    def online(self) -> dict[int, str]:
+        """All online users on this host: ``{user_id: username}``."""
+        merged = dict(self._usernames)
+        if not self.directory:
+            return merged
+        now = time.time()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not name.endswith('.json') or path == self.path:
+                continue
+            try:
+                if now - os.stat(path).st_mtime > self.stale_after:
+                    os.unlink(path)
+                    continue
+                with open(path) as f:
+                    merged.update({int(k): v for k, v in json.load(f).items()})
+            except (OSError, ValueError):
+                continue  # removed or replaced while reading
+        return merged
+
+    def tick(self) -> dict | None:
+        """Publish local state and return the diff since the last tick, if any."""
+        if self.directory:
+            if self._dirty:
+                self._write_local()
+            else:
+                try:
+                    os.utime(self.path)  # heartbeat
+                except FileNotFoundError:
+                    self._write_local()  # reaped while we were stalled
+        self._dirty = False
+        current = self.online()
+        came = [{'user_id': uid, 'username': name}
+                for uid, name in current.items() if uid not in self._published]
+        went = [uid for uid in self._published if uid not in current]
+        self._published = current
+        if not came and not went:
+            return None
+        return {'online': came, 'offline': went}
+
+    # -- background loop --
+    def start(self, emit: Callable[[dict], Awaitable]):
+        """Start the diff loop once (needs a running event loop)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(emit))
+
+    async def _run(self, emit: Callable[[dict], Awaitable]):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                diff = self.tick()
+                if diff:
+                    await emit(diff)
+            except Exception as e:
+                print(f"[Presence] Tick failed: {e}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self.directory:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+    def snapshot(self) -> dict:
+        return {
+            'local_sockets': len(self.sessions),
+            'local_users': len(self.by_user),
+            'online_users': len(self._published),
+            'interval_ms': self.interval * 1000,
+        }
+
+
+presence = PresenceRegistry()
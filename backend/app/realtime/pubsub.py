@@ -0,0 +1,170 @@
+"""Pub/sub client managers that fan Socket.IO emits out across workers."""
+import asyncio
+import atexit
+import json
+import os
+import socket
+from urllib.parse import urlparse
+
+import socketio
+from socketio.asyncio_pubsub_manager import AsyncPubSubManager
+
+from .broadcast import BroadcastMixin, BroadcastManager
+from .signals import SignalMixin
+
+DEFAULT_UNIX_DIR = '/tmp/team-messenger-sio'
+# Upper bound for one pub/sub datagram (a single emit with its payload)
+MAX_DATAGRAM = 1024 * 1024
+
+
+class AsyncUnixSocketManager(AsyncPubSubManager):
+    """Broker-less pub/sub over Unix datagram sockets.
+
+    Every listening worker binds ``<dir>/<channel>.<host_id>.sock``; a publish
+    sends one datagram to each socket found in the directory (our own
+    included, the base class relies on that for local delivery). Peers are
+    only rescanned when the directory changes, and sockets left behind by
+    dead workers are unlinked on the first refused send.
+
+    Messages are JSON, so binary payloads are not supported. Only processes
+    on the same host can share a directory - use ``redis://`` to span hosts.
+    """
+    name = 'unixsocket'
+
+    def __init__(self, url=f'unix://{DEFAULT_UNIX_DIR}', channel='socketio',
+                 write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.directory = urlparse(url).path or DEFAULT_UNIX_DIR
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        self.path = os.path.join(self.directory, f'{channel}.{self.host_id}.sock')
+        self._sock: socket.socket | None = None
+        self._peers: dict[str, socket.socket] = {}
+        self._peers_mtime: int | None = None
+
+    def _bind(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, MAX_DATAGRAM * 4)
+        sock.setblocking(False)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        sock.bind(self.path)
+        self._sock = sock
+        atexit.register(self.close)
+
+    def close(self):
+        """Close sockets and remove our socket file."""
+        for sock in self._peers.values():
+            sock.close()
+        self._peers.clear()
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+    def _drop_peer(self, path: str, unlink: bool = False):
+        sock = self._peers.pop(path, None)
+        if sock is not None:
+            sock.close()
+        if unlink:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def _refresh_peers(self):
+        """Sync the connected peer sockets with the directory listing."""
+        mtime = os.stat(self.directory).st_mtime_ns
+        if mtime == self._peers_mtime:
+            return
+        self._peers_mtime = mtime
+        prefix = self.channel + '.'
+        paths = {
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.startswith(prefix) and name.endswith('.sock')
+        }
+        for path in list(self._peers):
+            if path not in paths:
+                self._drop_peer(path)
+        for path in paths - self._peers.keys():
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, MAX_DATAGRAM * 2)
+            sock.setblocking(False)
+            try:
+                # Connected datagram sockets block (here: await) while the
+                # peer's receive queue is full instead of dropping messages
+                sock.connect(path)
+            except ConnectionRefusedError:
+                sock.close()
+                self._drop_peer(path, unlink=True)
+                continue
+            except OSError:
+                sock.close()
+                continue
+            self._peers[path] = sock
+
+    async def _publish(self, data):
+        payload = json.dumps(data, separators=(',', ':')).encode('utf-8')
+        if len(payload) > MAX_DATAGRAM:
+            self._get_logger().error('pubsub message too large (%d bytes), dropped', len(payload))
+            return
+        self._refresh_peers()
+        loop = asyncio.get_running_loop()
+        for path, sock in list(self._peers.items()):
+            try:
+                await loop.sock_sendall(sock, payload)
+            except (ConnectionRefusedError, FileNotFoundError):
+                self._drop_peer(path, unlink=True)
+            except OSError as e:
+                self._get_logger().warning('pubsub send to %s failed: %s', path, e)
+
+    async def _listen(self):
+        if self._sock is None:
+            self._bind()
+        sock = self._sock
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                data = await loop.sock_recv(sock, MAX_DATAGRAM)
+            except OSError:
+                if sock.fileno() == -1:
+                    return  # closed by close()
+                raise
+            try:
+                yield json.loads(data)
+            except ValueError:
+                continue
+
+
+class UnixSocketBroadcastManager(BroadcastMixin, SignalMixin, AsyncUnixSocketManager):
+    pass
+
+
+class RedisBroadcastManager(BroadcastMixin, SignalMixin, socketio.AsyncRedisManager):
+    pass
+
+
+class AioPikaBroadcastManager(BroadcastMixin, SignalMixin, socketio.AsyncAioPikaManager):
+    pass
+
+
+def create_client_manager(url: str, channel: str = 'socketio', write_only: bool = False):
+    """Build the Socket.IO client manager for a message queue URL.
+
+    An empty URL gives the in-process manager. All variants use the
+    encode-once broadcast path from ``realtime.broadcast`` and carry
+    server-only signals (``realtime.signals``).
+    """
+    if not url:
+        return BroadcastManager()
+    scheme = urlparse(url).scheme
+    if scheme == 'unix':
+        return UnixSocketBroadcastManager(url, channel=channel, write_only=write_only)
+    if scheme in ('redis', 'rediss'):
+        return RedisBroadcastManager(url, channel=channel, write_only=write_only)
+    if scheme.startswith('amqp'):
+        return AioPikaBroadcastManager(url, channel=channel, write_only=write_only)
+    raise ValueError(f'Unsupported SOCKETIO_MESSAGE_QUEUE scheme: {scheme}')
@@ -0,0 +1,122 @@
+"""Per-user push coalescing: one push for a burst of notifications."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from ..core.config import OUTBOX_PUSH_WORKERS, PUSH_COALESCE_MS
+from ..core.metrics import registry
+from ..services import push_service
+from .persistence import SocketDB
+
+pushes_requested = registry.counter(
+    'push_coalesce_requested_total', 'Pushes handed to the coalescer.', ('event',))
+pushes_saved = registry.counter(
+    'push_coalesce_saved_total', 'Pushes not sent: merged into a digest or no longer needed.', ('event',))
+
+
+class PushCoalescer:
+    """Holds pushes per user and type for a short window, then sends one.
+
+    ``add(event, payload)`` stands for ``push_service.notify_<event>(db,
+    **payload)``. For types with a window the first push of a user opens a
+    bucket and later ones join it; when the window closes, ``filters[event]``
+    may drop items that no longer matter (chat messages the user has read
+    meanwhile) and, if any are left, a single push goes out: the item itself,
+    ``notify_<event>_digest(db, user_id, items)`` for several, or, for types
+    without a digest, just the newest item (task pushes are tagged per task,
+    so the device would replace the older ones anyway).
+
+    Pushes are sent on a small thread pool like the outbox ones. Buckets
+    live in memory on the worker that produced the pushes: a restart loses
+    at most one window of them, and a user whose pushes come from several
+    workers may get one digest per worker.
+    """
+
+    def __init__(self, db: SocketDB, windows: dict[str, float] = PUSH_COALESCE_MS,
+                 workers: int = OUTBOX_PUSH_WORKERS):
+        self.db = db
+        self.windows = {event: ms / 1000 for event, ms in windows.items() if ms > 0}
+        self.filters: dict[str, Callable[[int, list[dict]], list[dict]]] = {}
+        self._buckets: dict[tuple[str, int], list[dict]] = {}
+        self._timers: dict[tuple[str, int], asyncio.TimerHandle] = {}
+        self._sending: set[asyncio.Task] = set()
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix='push-coalesce')
+        self.stats = {'requested': 0, 'sent': 0, 'digests': 0, 'saved': 0, 'skipped': 0, 'failed': 0}
+
+    def window(self, event: str) -> float:
+        return self.windows.get(event, 0.0)
+
+    def add(self, event: str, payload: dict):
+        """Queue ``notify_<event>`` for ``payload['user_id']`` (call on the loop)."""
+        self.stats['requested'] += 1
+        pushes_requested.inc(event)
+        window = self.window(event)
+        if not window:
+            self._send(event, payload['user_id'], [payload])
+            return
+        key = (event, payload['user_id'])
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._buckets[key] = [payload]
+            self._timers[key] = asyncio.get_running_loop().call_later(window, self._flush, key)
+        else:
+            bucket.append(payload)
+
+    def _flush(self, key: tuple[str, int]):
+        self._timers.pop(key, None)
+        items = self._buckets.pop(key, None)
+        if items:
+            self._send(key[0], key[1], items)
+
+    def _send(self, event: str, user_id: int, items: list[dict]):
+        task = asyncio.create_task(self._deliver(event, user_id, items))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _deliver(self, event: str, user_id: int, items: list[dict]):
+        requested = len(items)
+        keep = self.filters.get(event)
+        if keep is not None:
+            items = keep(user_id, items)
+        if not items:
+            self.stats['skipped'] += 1
+            self._saved(event, requested)
+            return
+        self._saved(event, requested - 1)
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._push, event, user_id, items)
+            self.stats['sent'] += 1
+            self.stats['digests'] += len(items) > 1
+        except Exception as e:
+            self.stats['failed'] += 1
+            print(f"[Push] {event} for user {user_id} failed: {e}")
+
+    def _saved(self, event: str, count: int):
+        if count:
+            self.stats['saved'] += count
+            pushes_saved.inc(event, amount=count)
+
+    def _push(self, event: str, user_id: int, items: list[dict]):
+        db = self.db.Session()
+        try:
+            digest = getattr(push_service, f'notify_{event}_digest', None)
+            if len(items) > 1 and digest is not None:
+                digest(db, user_id, items)
+            else:
+                getattr(push_service, f'notify_{event}')(db, **items[-1])
+        finally:
+            db.close()
+
+    async def stop(self):
+        """Send what is held right away and wait for it."""
+        for key in list(self._timers):
+            self._timers[key].cancel()
+            self._flush(key)
+        if self._sending:
+            await asyncio.gather(*self._sending, return_exceptions=True)
+        self._executor.shutdown(wait=True)
+
+    def snapshot(self) -> dict:
+        return {**self.stats, 'buckets': len(self._buckets),
+                'held': sum(len(items) for items in self._buckets.values())}
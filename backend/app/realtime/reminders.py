@@ -0,0 +1,160 @@
+"""Due-date reminders from an in-memory min-heap of pending tasks."""
+import asyncio
+import heapq
+import time
+from datetime import datetime, timedelta, timezone
+
+from ..core.config import REMINDER_CATCHUP_MINUTES, REMINDER_LEAD_MINUTES
+from ..services import task_service
+from .persistence import SocketDB
+
+
+def _parse(value) -> datetime | None:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return task_service.utc_naive(value)
+
+
+class ReminderScheduler:
+    """Fires ``task_due`` (event plus push) when a task's due date arrives.
+
+    Upcoming due dates are loaded once at startup; after that the heap
+    follows the task events (``task_created``, ``task_updated``,
+    ``tasks_updated``, ``task_deleted``) through broadcast taps, so every
+    worker hears about every change and nothing polls the tasks table.
+
+    ``_due`` holds the current due date of each pending task; heap entries
+    that no longer match it (rescheduled, done, deleted) are skipped when
+    they surface and the heap is rebuilt once they outnumber the live ones,
+    so memory follows the number of pending reminders. Each worker fires
+    its own heap, and ``task_service.fire_reminder`` re-checks the task and
+    records the reminder, so only one of them sends it.
+    """
+
+    def __init__(self, db: SocketDB, lead: float = REMINDER_LEAD_MINUTES * 60,
+                 catchup: float = REMINDER_CATCHUP_MINUTES * 60):
+        self.db = db
+        self.lead = lead
+        self.catchup = catchup
+        self._heap: list[tuple[float, int, datetime]] = []
+        self._due: dict[int, datetime] = {}
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        # Lookups started by taps; the loop only keeps weak references to tasks
+        self._reloads: set[asyncio.Task] = set()
+        self.stats = {'scheduled': 0, 'cancelled': 0, 'fired': 0, 'skipped': 0, 'compactions': 0}
+
+    def _fire_at(self, due: datetime) -> float:
+        return due.replace(tzinfo=timezone.utc).timestamp() - self.lead
+
+    def schedule(self, task_id: int, due: datetime | None):
+        """Set (or with None, clear) the pending reminder of a task."""
+        if due is None:
+            self.cancel(task_id)
+            return
+        if self._due.get(task_id) == due:
+            return
+        self._due[task_id] = due
+        fire_at = self._fire_at(due)
+        heapq.heappush(self._heap, (fire_at, task_id, due))
+        self.stats['scheduled'] += 1
+        if self._wakeup is not None and self._heap[0][1] == task_id:
+            self._wakeup.set()  # new earliest reminder
+        self._maybe_compact()
+
+    def cancel(self, task_id: int):
+        if self._due.pop(task_id, None) is not None:
+            self.stats['cancelled'] += 1
+            self._maybe_compact()
+
+    def _maybe_compact(self):
+        if len(self._heap) > 2 * len(self._due) + 64:
+            self._heap = [(self._fire_at(due), task_id, due) for task_id, due in self._due.items()]
+            heapq.heapify(self._heap)
+            self.stats['compactions'] += 1
+
+    # -- Taps --
+
+    def on_task_changed(self, data: dict):
+        """Tap for ``task_created`` / ``task_updated``."""
+        due = _parse(data.get('due_date'))
+        if data.get('status') == 'done' or due is None or self._fire_at(due) < time.time() - self.catchup:
+            self.cancel(data['id'])
+        else:
+            self.schedule(data['id'], due)
+
+    def on_task_deleted(self, data: dict):
+        self.cancel(data['id'])
+
+    def on_tasks_updated(self, data: dict):
+        """Tap for bulk ``tasks_updated``: done or archived tasks drop out,
+        reopened or restored ones are looked up again."""
+        if data.get('status') == 'done' or data.get('archived') is True:
+            for task_id in data['ids']:
+                self.cancel(task_id)
+        elif 'status' in data or data.get('archived') is False:
+            if self._task is not None:
+                task = asyncio.create_task(self._reload(data['ids']))
+                self._reloads.add(task)
+                task.add_done_callback(self._reloads.discard)
+
+    # -- Loop --
+
+    async def _load(self, task_ids: list[int] | None = None):
+        since = datetime.utcnow() - timedelta(seconds=self.catchup) + timedelta(seconds=self.lead)
+        rows = await self.db.run(task_service.upcoming_due, since, task_ids)
+        for task_id, due in rows:
+            self.schedule(task_id, _parse(due))
+
+    async def _reload(self, task_ids: list[int]):
+        try:
+            await self._load(task_ids)
+        except Exception as e:
+            print(f"[Reminders] Loading tasks {task_ids} failed: {e}")
+
+    def start(self):
+        """Load upcoming due dates and start the timer (needs a running event loop)."""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        try:
+            await self._load()
+        except Exception as e:
+            print(f"[Reminders] Loading due dates failed: {e}")
+        while True:
+            # Sleep until the earliest reminder, or until an earlier one is scheduled
+            timeout = self._heap[0][0] - time.time() if self._heap else None
+            if timeout is None or timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                _, task_id, due = heapq.heappop(self._heap)
+                if self._due.get(task_id) != due:
+                    continue  # superseded entry
+                del self._due[task_id]
+                try:
+                    fired = await self.db.run(task_service.fire_reminder, task_id, due)
+                except Exception as e:
+                    print(f"[Reminders] Task {task_id} reminder failed: {e}")
+                    continue
+                self.stats['fired' if fired else 'skipped'] += 1
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in list(self._reloads):
+            task.cancel()
+
+    def snapshot(self) -> dict:
+        next_at = self._heap[0][0] if self._due and self._heap else None
+        return {**self.stats, 'pending': len(self._due), 'heap': len(self._heap),
+                'next_in_s': round(next_at - time.time(), 1) if next_at else None}
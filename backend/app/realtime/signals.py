@@ -0,0 +1,44 @@
+"""Server-only signals between workers over the Socket.IO client manager."""
+from socketio.asyncio_pubsub_manager import AsyncPubSubManager
+
+# Signals travel as emits to this namespace. No handlers are registered on
+# it, so no client can connect to it, and they are taken off before delivery.
+SIGNAL_NAMESPACE = '/_signals'
+
+
+class SignalMixin:
+    """Client manager mixin for signals that only servers see.
+
+    ``signal(name, data)`` calls the function registered with
+    ``on_signal(name, fn)`` on every worker, this one included, so
+    per-process state (caches) can follow a change made on any of them.
+    With a pub/sub backend the signal is published like an emit to
+    ``SIGNAL_NAMESPACE`` and handled in ``_handle_emit`` instead of being
+    delivered; without one it runs right away. Clients never receive it.
+    """
+    signal_handlers: dict = {}
+
+    def on_signal(self, name: str, fn) -> None:
+        self.signal_handlers = {**self.signal_handlers, name: fn}
+
+    async def signal(self, name: str, data: dict) -> None:
+        if isinstance(self, AsyncPubSubManager):
+            await self._publish({'method': 'emit', 'event': name, 'data': data,
+                                 'namespace': SIGNAL_NAMESPACE, 'room': None,
+                                 'skip_sid': None, 'callback': None, 'host_id': self.host_id})
+        else:
+            self._run_signal(name, data)
+
+    def _run_signal(self, name, data):
+        fn = self.signal_handlers.get(name)
+        if fn is not None:
+            try:
+                fn(data)
+            except Exception as e:
+                print(f"[Socket.IO] Signal {name} failed: {e}")
+
+    async def _handle_emit(self, message):
+        if message.get('namespace') == SIGNAL_NAMESPACE:
+            self._run_signal(message.get('event'), message.get('data'))
+            return
+        return await super()._handle_emit(message)
@@ -0,0 +1,127 @@
+"""Typing indicators: per-room typing sets with expiry, emitted in batches."""
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable
+
+from ..core.config import TYPING_INTERVAL_MS, TYPING_TTL_MS
+from ..core.metrics import registry
+
+typing_received = registry.counter(
+    'typing_events_received_total', 'Typing events received from clients.')
+typing_emitted = registry.counter(
+    'typing_updates_emitted_total', 'Room typing updates broadcast.')
+
+
+class TypingTracker:
+    """Turns per-keystroke ``typing`` events into one ``room_typing`` update
+    per room per interval.
+
+    Repeated events from a user who is already typing only push their expiry
+    forward. A room is emitted on the next tick when someone starts or stops;
+    the payload lists who is typing (on this worker) and who ``stopped``
+    (expired, sent their message or disconnected), so clients can merge
+    updates from several workers.
+    """
+
+    def __init__(self, interval: float = TYPING_INTERVAL_MS / 1000,
+                 ttl: float = TYPING_TTL_MS / 1000):
+        self.interval = interval
+        self.ttl = ttl
+        # room -> user_id -> (username, expires_at)
+        self.rooms: dict[str, dict[int, tuple[str, float]]] = {}
+        # room -> user_id -> username, stopped since the last tick
+        self._stopped: dict[str, dict[int, str]] = {}
+        self._dirty: set[str] = set()
+        self._task: asyncio.Task | None = None
+        self.received = 0
+        self.emitted = 0
+        self._history: deque[tuple[float, int, int]] = deque(maxlen=20)
+
+    def touch(self, room: str, user_id: int, username: str, now: float | None = None):
+        """Record a typing event from ``user_id`` in ``room``."""
+        now = time.monotonic() if now is None else now
+        self.received += 1
+        typing_received.inc()
+        typers = self.rooms.setdefault(room, {})
+        if user_id not in typers:
+            self._dirty.add(room)
+            stopped = self._stopped.get(room)
+            if stopped:
+                stopped.pop(user_id, None)
+        typers[user_id] = (username, now + self.ttl)
+
+    def stop(self, room: str, user_id: int):
+        """The user stopped typing in ``room`` (e.g. sent the message)."""
+        typers = self.rooms.get(room)
+        if typers and user_id in typers:
+            username, _ = typers.pop(user_id)
+            self._stopped.setdefault(room, {})[user_id] = username
+            self._dirty.add(room)
+            if not typers:
+                del self.rooms[room]
+
+    def stop_user(self, user_id: int):
+        for room in [r for r, typers in self.rooms.items() if user_id in typers]:
+            self.stop(room, user_id)
+
+    def tick(self, now: float | None = None) -> list[dict]:
+        """Expire stale typers and return one update per changed room."""
+        now = time.monotonic() if now is None else now
+        for room, typers in list(self.rooms.items()):
+            for user_id, (_, expires_at) in list(typers.items()):
+                if expires_at <= now:
+                    self.stop(room, user_id)
+        updates = []
+        for room in self._dirty:
+            typers = self.rooms.get(room, {})
+            stopped = self._stopped.pop(room, {})
+            updates.append({
+                'room': room,
+                'typing': [{'user_id': uid, 'username': name} for uid, (name, _) in typers.items()],
+                'stopped': [{'user_id': uid, 'username': name} for uid, name in stopped.items()],
+            })
+        self._dirty.clear()
+        self.emitted += len(updates)
+        if updates:
+            typing_emitted.inc(amount=len(updates))
+        self._history.append((now, self.received, self.emitted))
+        return updates
+
+    def start(self, emit: Callable[[dict], Awaitable]):
+        """Start the tick loop once (needs a running event loop)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(emit))
+
+    async def _run(self, emit: Callable[[dict], Awaitable]):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                for update in self.tick():
+                    await emit(update)
+            except Exception as e:
+                print(f"[Typing] Tick failed: {e}")
+
+    async def stop_loop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def snapshot(self) -> dict:
+        """Totals plus in/out rates over the recent ticks."""
+        received_rate = emitted_rate = 0.0
+        if len(self._history) > 1:
+            (t0, r0, e0), (t1, r1, e1) = self._history[0], self._history[-1]
+            if t1 > t0:
+                received_rate = (r1 - r0) / (t1 - t0)
+                emitted_rate = (e1 - e0) / (t1 - t0)
+        return {
+            'received_total': self.received,
+            'emitted_total': self.emitted,
+            'received_per_sec': round(received_rate, 2),
+            'emitted_per_sec': round(emitted_rate, 2),
+            'active_rooms': len(self.rooms),
+        }
+
+
+typing_tracker = TypingTracker()
@@ -0,0 +1,307 @@
+"""Unread counters kept in memory from read markers, persisted in batches."""
+import asyncio
+import threading
+from collections import OrderedDict
+
+from sqlalchemy.orm import Session
+
+from ..core.config import UNREAD_FLUSH_MS, UNREAD_MAX_ROOMS
+from ..services import read_service
+
+
+class Marker:
+    __slots__ = ('last_read_id', 'unread', 'dirty')
+
+    def __init__(self, last_read_id: int = 0, unread: int = 0, dirty: bool = False):
+        self.last_read_id = last_read_id
+        self.unread = unread
+        self.dirty = dirty
+
+
+class RoomMarkers:
+    __slots__ = ('markers', 'last_id')
+
+    def __init__(self, last_id: int):
+        self.markers: dict[int, Marker] = {}
+        self.last_id = last_id
+
+
+class UnreadTracker:
+    """Per-user, per-room unread counts.
+
+    A room's markers are loaded on first use; from then on every stored
+    message (seen through the ``new_message`` broadcast, on every worker)
+    bumps the count of each user who has a marker in the room, and
+    ``mark_read`` resets it. Counting is therefore O(readers) per message and
+    ``counts(user)`` is O(rooms), never a scan of messages.
+
+    Changed markers are written back every ``interval`` along with the
+    newest message they account for (``counted_through``), so a worker
+    loading the room later only counts the messages since.
+
+    At most ``max_rooms`` rooms are kept, least recently used first out;
+    only rooms without unsaved markers are dropped, and a dropped room is
+    loaded again (with its count) on next use.
+
+    Called from the loop (taps) and from DB threads (REST, socket_db), so
+    state sits behind a lock that is never held across a query.
+    """
+
+    def __init__(self, interval: float = UNREAD_FLUSH_MS / 1000, max_rooms: int = UNREAD_MAX_ROOMS):
+        self.interval = interval
+        self.max_rooms = max_rooms
+        self.rooms: OrderedDict[str, RoomMarkers] = OrderedDict()
+        # user_id -> rooms they have a marker in, once asked for
+        self.user_rooms: dict[int, set[str]] = {}
+        # room -> (id, sender) lists of loads in progress, see _room()
+        self._loading: dict[str, list[list[tuple[int, int]]]] = {}
+        self._lock = threading.Lock()
+        self._task: asyncio.Task | None = None
+        self.loads = 0
+        self.evictions = 0
+        self.increments = 0
+        self.flushed = 0
+
+    # -- Message stream --
+
+    def on_message(self, payload: dict):
+        """Tap for ``new_message``."""
+        room, msg_id, sender = payload['room'], payload['id'], payload.get('sender_id')
+        with self._lock:
+            for pending in self._loading.get(room, ()):
+                pending.append((msg_id, sender))
+            state = self.rooms.get(room)
+            if state is not None:
+                self._count(state, msg_id, sender)
+
+    def on_deleted(self, data: dict):
+        """Tap for ``message_deleted``: an unread message no longer counts."""
+        sender = data.get('sender_id')
+        with self._lock:
+            state = self.rooms.get(data['room'])
+            if state is None:
+                return
+            for user_id, marker in state.markers.items():
+                if user_id != sender and data['id'] > marker.last_read_id and marker.unread:
+                    marker.unread -= 1
+                    marker.dirty = True
+
+    def _count(self, state: RoomMarkers, msg_id: int, sender: int | None):
+        if msg_id <= state.last_id:
+            return  # already counted (duplicate delivery or part of the load)
+        state.last_id = msg_id
+        for user_id, marker in state.markers.items():
+            if user_id != sender and msg_id > marker.last_read_id:
+                marker.unread += 1
+                marker.dirty = True
+                self.increments += 1
+
+    def _room(self, db: Session, room: str) -> RoomMarkers:
+        with self._lock:
+            state = self.rooms.get(room)
+            if state is not None:
+                self.rooms.move_to_end(room)
+                return state
+            # Messages broadcast while the query runs are collected and
+            # applied on top of what it returned
+            pending: list[tuple[int, int]] = []
+            self._loading.setdefault(room, []).append(pending)
+        try:
+            rows, newer, last_id = read_service.load_room(db, room)
+        finally:
+            with self._lock:
+                loads = self._loading[room]
+                loads.remove(pending)
+                if not loads:
+                    del self._loading[room]
+        with self._lock:
+            state = self.rooms.get(room)
+            if state is not None:
+                return state  # loaded concurrently
+            state = RoomMarkers(last_id)
+            for row in rows:
+                marker = Marker(row.last_read_id, row.unread)
+                for msg_id, sender in newer:
+                    if msg_id > row.counted_through and msg_id > row.last_read_id and sender != row.user_id:
+                        marker.unread += 1
+                        marker.dirty = True
+                state.markers[row.user_id] = marker
+            for msg_id, sender in pending:
+                self._count(state, msg_id, sender)
+            self.rooms[room] = state
+            self.loads += 1
+            self._evict()
+            return state
+
+    def _evict(self):
+        # Oldest first; rooms with unsaved markers wait for the next flush
+        excess = len(self.rooms) - self.max_rooms
+        if excess <= 0:
+            return
+        victims = []
+        for name, state in self.rooms.items():
+            if not any(marker.dirty for marker in state.markers.values()):
+                victims.append(name)
+                if len(victims) == excess:
+                    break
+        for name in victims:
+            del self.rooms[name]
+        self.evictions += len(victims)
+
+    # -- Reads --
+
+    def mark_read(self, db: Session, user_id: int, room: str, last_read_id: int) -> tuple[int, int]:
+        """Move the user's marker forward; returns ``(last_read_id, unread)``."""
+        state = self._room(db, room)
+        with self._lock:
+            # Ids past the newest message would hide the next ones from the count
+            last_read_id = min(last_read_id, state.last_id)
+            marker = state.markers.get(user_id)
+            if marker is not None and last_read_id <= marker.last_read_id:
+                return marker.last_read_id, marker.unread
+            caught_up = last_read_id >= state.last_id
+        # Reading up to the newest message is the usual case and needs no query
+        unread = 0 if caught_up else read_service.count_unread(db, room, user_id, last_read_id)
+        with self._lock:
+            marker = state.markers.get(user_id)
+            if marker is None:
+                marker = state.markers[user_id] = Marker()
+                rooms = self.user_rooms.get(user_id)
+                if rooms is not None:
+                    rooms.add(room)
+            if last_read_id > marker.last_read_id:
+                marker.last_read_id = last_read_id
+                marker.unread = unread
+                marker.dirty = True
+            return marker.last_read_id, marker.unread
+
+    def readers(self, db: Session | None, room: str) -> dict[int, int] | None:
+        """``{user_id: last_read_id}`` of everyone with a marker in the room;
+        with ``db`` None, only if the room is already loaded."""
+        if db is None:
+            with self._lock:
+                state = self.rooms.get(room)
+                if state is None:
+                    return None
+        else:
+            state = self._room(db, room)
+        with self._lock:
+            return {user_id: marker.last_read_id for user_id, marker in state.markers.items()}
+
+    def last_read(self, user_id: int, room: str) -> int | None:
+        """The user's read position if the room is loaded (no query)."""
+        with self._lock:
+            state = self.rooms.get(room)
+            marker = state and state.markers.get(user_id)
+            return marker.last_read_id if marker is not None else None
+
+    def apply_read(self, data: dict):
+        """Tap for ``unread``: a read marker moved on another worker (already persisted there)."""
+        with self._lock:
+            state = self.rooms.get(data['room'])
+            if state is None:
+                return
+            marker = state.markers.get(data['user_id'])
+            if marker is None:
+                marker = state.markers[data['user_id']] = Marker()
+                rooms = self.user_rooms.get(data['user_id'])
+                if rooms is not None:
+                    rooms.add(data['room'])
+            if data['last_read_id'] > marker.last_read_id:
+                marker.last_read_id = data['last_read_id']
+                marker.unread = data['unread']
+
+    def counts(self, db: Session, user_id: int) -> dict[str, dict]:
+        """``{room: {last_read_id, unread}}`` for every room the user has read."""
+        with self._lock:
+            rooms = self.user_rooms.get(user_id)
+        if rooms is None:
+            loaded = set(read_service.user_rooms(db, user_id))
+            with self._lock:
+                rooms = self.user_rooms.setdefault(user_id, set())
+                rooms |= loaded
+        result = {}
+        for room in sorted(rooms):
+            state = self._room(db, room)
+            with self._lock:
+                marker = state.markers.get(user_id)
+                if marker is not None:
+                    result[room] = {'last_read_id': marker.last_read_id, 'unread': marker.unread}
+        return result
+
+    # -- Persistence --
+
+    def flush(self, db: Session, user_id: int | None = None, room: str | None = None) -> int:
+        """Write changed markers, only ``user_id``'s in ``room`` if given; returns how many."""
+        with self._lock:
+            if room is None:
+                rooms = list(self.rooms.items())
+            else:
+                rooms = [(room, self.rooms[room])] if room in self.rooms else []
+            rows = []
+            for name, state in rooms:
+                for reader, marker in state.markers.items():
+                    if marker.dirty and user_id in (None, reader):
+                        marker.dirty = False
+                        rows.append({
+                            'user_id': reader, 'room': name, 'last_read_id': marker.last_read_id,
+                            'unread': marker.unread, 'counted_through': state.last_id,
+                        })
+        try:
+            read_service.save_markers(db, rows)
+        except Exception:
+            with self._lock:
+                for row in rows:
+                    state = self.rooms.get(row['room'])
+                    marker = state and state.markers.get(row['user_id'])
+                    if marker is not None:
+                        marker.dirty = True
+            raise
+        self.flushed += len(rows)
+        return len(rows)
+
+    def forget_user(self, user_id: int):
+        with self._lock:
+            self.user_rooms.pop(user_id, None)
+            for state in self.rooms.values():
+                state.markers.pop(user_id, None)
+
+    def start(self, run_db):
+        """Start the flush loop once; ``run_db`` is ``socket_db.run``."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(run_db))
+
+    async def _run(self, run_db):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await run_db(self.flush)
+            except Exception as e:
+                print(f"[Unread] Flush failed: {e}")
+
+    async def stop(self, run_db):
+        """Stop the loop and write what is left."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        try:
+            await run_db(self.flush)
+        except Exception as e:
+            print(f"[Unread] Final flush failed: {e}")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            markers = sum(len(s.markers) for s in self.rooms.values())
+            dirty = sum(m.dirty for s in self.rooms.values() for m in s.markers.values())
+        return {
+            'rooms': len(self.rooms),
+            'markers': markers,
+            'dirty': dirty,
+            'loads': self.loads,
+            'evictions': self.evictions,
+            'increments': self.increments,
+            'flushed': self.flushed,
+        }
+
+
+unread_tracker = UnreadTracker()
@@ -0,0 +1,114 @@
+"""Write-behind buffer that group-commits chat messages."""
+import asyncio
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+
+from sqlalchemy.orm import Session
+
+from ..core.config import MESSAGE_FLUSH_MS, MESSAGE_BATCH_MAX
+from ..services import message_service
+from .persistence import SocketDB
+
+
+def _insert_batch(db: Session, items: list[dict]) -> list[dict]:
+    """Insert a batch and return ``new_message`` payloads in the same order."""
+    return message_service.to_payloads(db, message_service.create_messages(db, items))
+
+
+class MessageWriter:
+    """Collects messages for ``flush_window`` seconds or ``max_batch`` items,
+    inserts them in one transaction and then emits ``new_message`` for each.
+
+    A single flusher task handles batches one after another and emits in
+    submission order, so messages of a room never overtake each other.
+    If a batch fails, its messages are retried one by one so a bad row only
+    loses itself; its sender gets ``message_error``.
+    """
+
+    def __init__(self, db: SocketDB, emit: Callable[..., Awaitable],
+                 flush_window: float = MESSAGE_FLUSH_MS / 1000,
+                 max_batch: int = MESSAGE_BATCH_MAX):
+        self.db = db
+        self.emit = emit
+        self.flush_window = flush_window
+        self.max_batch = max_batch
+        self._pending: list[dict] = []
+        self._wakeup = asyncio.Event()
+        self._timer: asyncio.TimerHandle | None = None
+        self._task: asyncio.Task | None = None
+        self._closing = False
+        self.stats = {'messages': 0, 'batches': 0, 'largest_batch': 0, 'failed': 0}
+
+    def submit(self, sender_id: int, content: str, room: str = 'general',
+               reply_to: int | None = None) -> None:
+        """Queue a message; it is stored and broadcast on the next flush."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        self._pending.append({
+            'sender_id': sender_id,
+            'content': content,
+            'room': room,
+            'reply_to': reply_to,
+            'created_at': datetime.now(timezone.utc),
+        })
+        if len(self._pending) >= self.max_batch:
+            self._wake()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.flush_window, self._wake)
+
+    def _wake(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._wakeup.set()
+
+    async def _run(self):
+        while not (self._closing and not self._pending):
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            await self._flush()
+
+    async def _flush(self):
+        # Messages arriving while a batch is being written form the next batch
+        while self._pending:
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            try:
+                payloads = await self.db.run(_insert_batch, batch)
+            except Exception as e:
+                print(f"[Socket.IO] Failed to store {len(batch)} messages, retrying one by one: {e}")
+                payloads = await self._store_each(batch)
+            else:
+                self.stats['batches'] += 1
+                self.stats['largest_batch'] = max(self.stats['largest_batch'], len(batch))
+            self.stats['messages'] += len(payloads)
+            for payload in payloads:
+                await self.emit('new_message', payload, room=payload['room'])
+
+    async def _store_each(self, batch: list[dict]) -> list[dict]:
+        payloads = []
+        for item in batch:
+            try:
+                payloads += await self.db.run(_insert_batch, [item])
+            except Exception as e:
+                self.stats['failed'] += 1
+                print(f"[Socket.IO] Failed to store a message from user {item['sender_id']}: {e}")
+                await self.emit('message_error', {
+                    'error': 'Message could not be stored',
+                    'room': item['room'],
+                    'content': item['content'],
+                }, room=f"user_{item['sender_id']}")
+        return payloads
+
+    async def close(self):
+        """Flush everything still buffered; call on shutdown."""
+        self._closing = True
+        self._wake()
+        if self._task is not None:
+            await self._task
+        if self._pending:
+            await self._flush()
+
+    def snapshot(self) -> dict:
+        return {**self.stats, 'pending': len(self._pending),
+                'flush_window_ms': self.flush_window * 1000, 'max_batch': self.max_batch}
@@ -20,3 +20,8 @@ class MessageOut(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class MessageSearchOut(BaseModel):
+    items: list[MessageOut]
+    next_cursor: Optional[str] = None
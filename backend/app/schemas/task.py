@@ -24,6 +24,13 @@ class TaskUpdate(BaseModel):
     status: Optional[TaskStatusEnum] = None
 
 
+class TaskBulkUpdate(BaseModel):
+    ids: list[int] = Field(..., min_length=1, max_length=500)
+    assigned_to: Optional[int] = None
+    status: Optional[TaskStatusEnum] = None
+    archived: Optional[bool] = None
+
+
 class TaskOut(BaseModel):
     id: int
     title: str
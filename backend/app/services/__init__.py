@@ -1,4 +1,5 @@
 # services package
 from . import task_service
 from . import message_service
+from . import user_service
 
@@ -1,6 +1,35 @@
+import base64
+import binascii
+
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from ..models import Message
-from typing import Optional
+from ..core.cache import PageCache
+from ..core.config import MESSAGE_PAGE_SIZE, MESSAGE_PAGE_CACHE_BYTES, MESSAGE_PAGE_TTL_S
+from . import outbox_service
+from .user_service import get_usernames
+from typing import Iterator, Optional
+
+# room -> newest MESSAGE_PAGE_SIZE messages as MessageOut-shaped dicts
+first_page_cache = PageCache(MESSAGE_PAGE_SIZE, MESSAGE_PAGE_CACHE_BYTES,
+                             sizeof=lambda row: 400 + len(row['content'] or ''), ttl=MESSAGE_PAGE_TTL_S)
+
+
+def to_payloads(db: Session, msgs: list[Message]) -> list[dict]:
+    """``MessageOut``/``new_message`` dicts for stored messages, in the same order.
+
+    Sender names come from the shared username cache: at most one query per call.
+    """
+    usernames = get_usernames(db, (m.sender_id for m in msgs))
+    return [{
+        'id': m.id,
+        'sender_id': m.sender_id,
+        'sender_username': usernames.get(m.sender_id, 'deleted'),
+        'content': m.content,
+        'room': m.room,
+        'reply_to': m.reply_to,
+        'created_at': m.created_at.isoformat(),
+    } for m in msgs]
 
 
 def create_message(db: Session, sender_id: int, content: str, 
@@ -12,17 +41,103 @@ def create_message(db: Session, sender_id: int, content: str,
         reply_to=reply_to
     )
     db.add(msg)
-    db.commit()
+    db.flush()
     db.refresh(msg)
+    payload = to_payloads(db, [msg])[0]
+    # Broadcast after commit; the new_message tap also fills the caches
+    outbox_service.add_emit(db, 'new_message', payload, room=room)
+    db.commit()
+    if room in first_page_cache:
+        first_page_cache.add(room, payload)
     return msg
 
 
-def get_messages(db: Session, room: str = "general", limit: int = 50, 
+def create_messages(db: Session, items: list[dict]) -> list[Message]:
+    """Insert several messages in one transaction, keeping the given order.
+
+    Each item has ``sender_id``, ``content``, ``room`` and optionally
+    ``reply_to``/``created_at``. Returned messages carry their new ids.
+    The caller broadcasts them as ``new_message``, which also updates
+    ``first_page_cache``.
+    """
+    msgs = [Message(**item) for item in items]
+    db.add_all(msgs)
+    db.commit()
+    return msgs
+
+
+def encode_cursor(message_id: int) -> str:
+    """Opaque cursor pointing just before ``message_id``."""
+    return base64.urlsafe_b64encode(f"m1:{message_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Message id from ``encode_cursor``; ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    version, _, message_id = raw.partition(":")
+    if version != "m1" or not message_id.isdigit():
+        raise ValueError("Invalid cursor")
+    return int(message_id)
+
+
+def get_messages(db: Session, room: str = "general", limit: int = 50,
                  before_id: Optional[int] = None) -> list[Message]:
+    """Up to ``limit`` messages older than ``before_id``, oldest first.
+
+    Keyset pagination over ``ix_messages_room_id`` (room, id): every page is
+    an index range scan, however deep the client has scrolled.
+    """
     query = db.query(Message).filter(Message.room == room)
     if before_id is not None:
         query = query.filter(Message.id < before_id)
-    return query.order_by(Message.created_at.desc()).limit(limit).all()[::-1]
+    return query.order_by(Message.id.desc()).limit(limit).all()[::-1]
+
+
+def get_latest_page(db: Session, room: str = "general", limit: int = 50) -> list[dict]:
+    """Newest ``limit`` messages of a room as dicts, oldest first; served from memory when hot."""
+    rows = first_page_cache.get(room, limit)
+    if rows is not None:
+        return rows
+    version = first_page_cache.version(room)
+    try:
+        msgs = (db.query(Message)
+                .filter(Message.room == room)
+                .order_by(Message.id.desc())
+                .limit(max(limit, first_page_cache.page_size))
+                .all()[::-1])
+        rows = to_payloads(db, msgs)
+    except Exception:
+        first_page_cache.abandon(room)
+        raise
+    first_page_cache.fill(room, rows, version)
+    return rows[-limit:]
+
+
+def get_messages_after(db: Session, room: str, after_id: int, limit: int) -> list[Message]:
+    """Oldest ``limit`` messages of a room with ``id > after_id``, in id order."""
+    return (db.query(Message)
+            .filter(Message.room == room, Message.id > after_id)
+            .order_by(Message.id)
+            .limit(limit)
+            .all())
+
+
+def iter_history(db: Session, room: str, after_id: Optional[int] = None,
+                 batch: int = 1000) -> Iterator[list[dict]]:
+    """The whole history of a room in id order, ``batch`` payload dicts at a time.
+
+    Rows are streamed (``yield_per``: a server-side cursor on PostgreSQL), so
+    memory stays flat however large the room is.
+    """
+    stmt = select(Message).where(Message.room == room).order_by(Message.id)
+    if after_id is not None:
+        stmt = stmt.where(Message.id > after_id)
+    result = db.execute(stmt.execution_options(yield_per=batch))
+    for msgs in result.scalars().partitions():
+        yield to_payloads(db, msgs)
 
 
 def get_message(db: Session, message_id: int) -> Optional[Message]:
@@ -30,5 +145,9 @@ def get_message(db: Session, message_id: int) -> Optional[Message]:
 
 
 def delete_message(db: Session, message: Message) -> None:
+    outbox_service.add_emit(db, 'message_deleted',
+                            {'id': message.id, 'room': message.room, 'sender_id': message.sender_id},
+                            room=message.room)
     db.delete(message)
     db.commit()
+    first_page_cache.remove(message.room, message.id)
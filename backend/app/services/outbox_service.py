@@ -0,0 +1,82 @@
+"""Transactional outbox: socket events and pushes stored with the change.
+
+Services call ``add_emit``/``add_push`` before their ``commit``; the rows
+become visible together with the change, or not at all on rollback. The
+dispatcher (``realtime.outbox``) claims, sends and deletes them.
+"""
+import time
+from typing import Callable, Optional
+
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.orm import Session
+
+from ..models import OutboxEvent
+
+# Called after a commit that wrote outbox rows (the dispatcher's wake-up)
+commit_hooks: list[Callable[[], None]] = []
+
+
+def add_emit(db: Session, event_name: str, payload: dict, room: Optional[str] = None) -> None:
+    """Emit ``event_name`` to ``room`` (everyone if None) after commit."""
+    db.add(OutboxEvent(kind='emit', event=event_name, room=room, payload=payload))
+    db.info['outbox'] = True
+
+
+def add_push(db: Session, notify: str, **kwargs) -> None:
+    """Call ``push_service.notify_<notify>(db, **kwargs)`` after commit."""
+    db.add(OutboxEvent(kind='push', event=notify, payload=kwargs))
+    db.info['outbox'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session: Session):
+    if session.info.pop('outbox', False):
+        for hook in commit_hooks:
+            hook()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _after_rollback(session: Session):
+    session.info.pop('outbox', None)
+
+
+def claim(db: Session, limit: int, lease: float) -> list[OutboxEvent]:
+    """Lease up to ``limit`` due rows, oldest first.
+
+    A leased row is invisible to other dispatchers for ``lease`` seconds; if
+    it is not deleted by then (crash, lost connection) it is delivered again.
+    """
+    now = time.time()
+    due = (select(OutboxEvent.id).where(OutboxEvent.available_at <= now)
+           .order_by(OutboxEvent.id).limit(limit))
+    if db.get_bind().dialect.name == 'postgresql':
+        due = due.with_for_update(skip_locked=True)
+    rows = db.execute(
+        update(OutboxEvent)
+        .where(OutboxEvent.id.in_(due.scalar_subquery()))
+        .values(available_at=now + lease, attempts=OutboxEvent.attempts + 1)
+        .returning(OutboxEvent.id, OutboxEvent.kind, OutboxEvent.event, OutboxEvent.room,
+                   OutboxEvent.payload, OutboxEvent.attempts, OutboxEvent.created_at)
+    ).all()
+    db.commit()
+    return sorted(rows, key=lambda row: row.id)
+
+
+def complete(db: Session, ids: list[int]) -> None:
+    if ids:
+        db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(ids)))
+        db.commit()
+
+
+def retry(db: Session, rows: list, max_attempts: int) -> list[int]:
+    """Back off failed rows exponentially; drop (and return) those out of attempts."""
+    now = time.time()
+    dropped = [row.id for row in rows if row.attempts >= max_attempts]
+    for row in rows:
+        if row.attempts < max_attempts:
+            db.execute(update(OutboxEvent).where(OutboxEvent.id == row.id)
+                       .values(available_at=now + min(300, 2 ** row.attempts)))
+    if dropped:
+        db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(dropped)))
+    db.commit()
+    return dropped
@@ -0,0 +1,169 @@
+"""Concurrent Web Push delivery over pooled keep-alive connections."""
+import asyncio
+import threading
+import time
+from typing import NamedTuple, Optional
+from urllib.parse import urlparse
+
+import aiohttp
+from py_vapid import Vapid
+from pywebpush import WebPusher
+
+from ..core.cache import LRUCache
+from ..core.config import (PUSH_CONCURRENCY, PUSH_CONNECTIONS_PER_HOST, PUSH_TIMEOUT_S,
+                           PUSH_TTL_S, VAPID_REFRESH_S, VAPID_TOKEN_TTL_S)
+
+
+class Subscription(NamedTuple):
+    id: int
+    endpoint: str
+    p256dh: str
+    auth: str
+
+
+class PushResult(NamedTuple):
+    subscription_id: int
+    endpoint: str
+    status: Optional[int]  # HTTP status, None if no response
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status is not None and 200 <= self.status < 300
+
+    @property
+    def gone(self) -> bool:
+        """The push service no longer knows the subscription: delete it."""
+        return self.status in (404, 410)
+
+
+class PushSender:
+    """Encrypts and POSTs Web Push messages from one event loop thread.
+
+    A single aiohttp session keeps connections to each push service (FCM,
+    Mozilla autopush, ...) alive between pushes, with at most
+    ``per_host`` per service; at most ``concurrency`` pushes are in flight
+    overall and each one gives up after ``timeout`` seconds. The loop runs
+    on its own thread, so the synchronous ``send`` can be called from
+    request handlers and the outbox push threads alike, and encryption
+    never runs on the Socket.IO loop.
+
+    VAPID ``Authorization`` headers are signed once per push service origin
+    (the JWT ``aud``) and reused for ``token_ttl`` seconds minus
+    ``refresh``: the cached entry expires that long before the token does,
+    so the next push re-signs it and none is sent close to its expiry.
+    """
+
+    def __init__(self, private_key: str, claims: dict, concurrency: int = PUSH_CONCURRENCY,
+                 per_host: int = PUSH_CONNECTIONS_PER_HOST, timeout: float = PUSH_TIMEOUT_S,
+                 ttl: int = PUSH_TTL_S, token_ttl: float = VAPID_TOKEN_TTL_S,
+                 refresh: float = VAPID_REFRESH_S):
+        self.private_key = private_key
+        self.claims = claims
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.ttl = ttl
+        self.token_ttl = token_ttl
+        self._vapid: Optional[Vapid] = None
+        self.vapid_cache = LRUCache(maxsize=256, ttl=max(token_ttl - refresh, 1))
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self.stats = {'sent': 0, 'failed': 0, 'gone': 0, 'timeouts': 0,
+                      'in_flight': 0, 'batches': 0, 'last_batch_ms': 0.0, 'vapid_signed': 0}
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='push-sender', daemon=True).start()
+                asyncio.run_coroutine_threadsafe(self._open(), loop).result()
+                self._loop = loop
+            return self._loop
+
+    async def _open(self):
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host,
+                                         keepalive_timeout=60)
+        self._session = aiohttp.ClientSession(
+            connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    def send(self, subscriptions: list[Subscription], payload: str) -> list[PushResult]:
+        """Deliver ``payload`` to every subscription; blocks until all are done."""
+        if not subscriptions:
+            return []
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self._send_all(subscriptions, payload), loop).result()
+
+    async def send_async(self, subscriptions: list[Subscription], payload: str) -> list[PushResult]:
+        """``send`` for callers on another event loop."""
+        if not subscriptions:
+            return []
+        loop = self._ensure_loop()
+        return await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(self._send_all(subscriptions, payload), loop))
+
+    async def _send_all(self, subscriptions: list[Subscription], payload: str) -> list[PushResult]:
+        started = time.perf_counter()
+        data = payload.encode()
+        results = await asyncio.gather(*(self._send_one(sub, data) for sub in subscriptions))
+        for result in results:
+            if result.ok:
+                self.stats['sent'] += 1
+            else:
+                self.stats['failed'] += 1
+                self.stats['gone'] += result.gone
+        self.stats['batches'] += 1
+        self.stats['last_batch_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        return results
+
+    def _vapid_headers(self, endpoint: str) -> dict:
+        url = urlparse(endpoint)
+        audience = f'{url.scheme}://{url.netloc}'
+        headers = self.vapid_cache.get(audience)
+        if headers is None:
+            if self._vapid is None:
+                self._vapid = Vapid.from_string(private_key=self.private_key)
+            headers = self._vapid.sign({**self.claims, 'aud': audience,
+                                        'exp': int(time.time() + self.token_ttl)})
+            self.vapid_cache.set(audience, headers)
+            self.stats['vapid_signed'] += 1
+        return headers
+
+    async def _send_one(self, sub: Subscription, data: bytes) -> PushResult:
+        async with self._semaphore:
+            self.stats['in_flight'] += 1
+            try:
+                info = {'endpoint': sub.endpoint, 'keys': {'p256dh': sub.p256dh, 'auth': sub.auth}}
+                body = WebPusher(info).encode(data, 'aes128gcm')['body']
+                headers = {**self._vapid_headers(sub.endpoint),
+                           'Content-Encoding': 'aes128gcm', 'TTL': str(self.ttl)}
+                async with self._session.post(sub.endpoint, data=body, headers=headers) as resp:
+                    text = await resp.text()
+                    error = None if resp.status < 300 else f'{resp.status} {resp.reason}: {text[:200]}'
+                    return PushResult(sub.id, sub.endpoint, resp.status, error)
+            except asyncio.TimeoutError:
+                self.stats['timeouts'] += 1
+                return PushResult(sub.id, sub.endpoint, None, 'timeout')
+            except Exception as e:
+                return PushResult(sub.id, sub.endpoint, None, str(e) or type(e).__name__)
+            finally:
+                self.stats['in_flight'] -= 1
+
+    def close(self):
+        """Close pooled connections and stop the loop thread."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(self._session.close(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+
+    def snapshot(self) -> dict:
+        connections = 0
+        if self._session is not None and not self._session.closed:
+            connector = self._session.connector
+            connections = sum(len(conns) for conns in getattr(connector, '_conns', {}).values())
+        return {**self.stats, 'idle_connections': connections,
+                'concurrency': self.concurrency, 'per_host': self.per_host}
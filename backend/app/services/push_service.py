@@ -1,9 +1,9 @@
 """Push notification service using Web Push API."""
 import os
 import json
-from pywebpush import webpush, WebPushException
 from sqlalchemy.orm import Session
 from ..models import PushSubscription
+from .push_sender import PushResult, PushSender, Subscription
 
 
 # VAPID keys - generate once and keep secret
@@ -20,6 +20,33 @@ VAPID_CLAIMS = {
     'sub': 'mailto:admin@corpchat.local'
 }
 
+# Shared by every caller: one connection pool per push service
+push_sender = PushSender(VAPID_PRIVATE_KEY, VAPID_CLAIMS)
+
+
+def deliver(db: Session, subscriptions: list, payload: str) -> list[PushResult]:
+    """Send ``payload`` to the given ``PushSubscription`` rows concurrently.
+
+    Returns one result per subscription; subscriptions the push service
+    reports as gone (404/410) are deleted.
+    """
+    results = push_sender.send(
+        [Subscription(s.id, s.endpoint, s.p256dh, s.auth) for s in subscriptions], payload)
+    failed_endpoints = []
+    for result in results:
+        if result.gone:
+            failed_endpoints.append(result.subscription_id)
+        elif not result.ok:
+            print(f"Push failed for {result.endpoint[:50]}...: {result.error}")
+
+    # Clean up invalid subscriptions
+    if failed_endpoints:
+        db.query(PushSubscription).filter(
+            PushSubscription.id.in_(failed_endpoints)
+        ).delete(synchronize_session=False)
+        db.commit()
+    return results
+
 
 def send_push_notification(
     db: Session,
@@ -38,9 +65,6 @@ def send_push_notification(
         PushSubscription.user_id == user_id
     ).all()
     
-    success_count = 0
-    failed_endpoints = []
-    
     payload = json.dumps({
         'title': title,
         'body': body,
@@ -48,40 +72,7 @@ def send_push_notification(
         'tag': tag or 'notification',
         'data': data or {},
     })
-    
-    for sub in subscriptions:
-        subscription_info = {
-            'endpoint': sub.endpoint,
-            'keys': {
-                'p256dh': sub.p256dh,
-                'auth': sub.auth,
-            }
-        }
-        
-        try:
-            webpush(
-                subscription_info=subscription_info,
-                data=payload,
-                vapid_private_key=VAPID_PRIVATE_KEY,
-                vapid_claims=VAPID_CLAIMS,
-            )
-            success_count += 1
-        except WebPushException as e:
-            print(f"Push failed for {sub.endpoint[:50]}...: {e}")
-            # Remove invalid subscriptions (410 Gone, 404 Not Found)
-            if e.response and e.response.status_code in (404, 410):
-                failed_endpoints.append(sub.id)
-        except Exception as e:
-            print(f"Push error: {e}")
-    
-    # Clean up invalid subscriptions
-    if failed_endpoints:
-        db.query(PushSubscription).filter(
-            PushSubscription.id.in_(failed_endpoints)
-        ).delete(synchronize_session=False)
-        db.commit()
-    
-    return success_count
+    return sum(result.ok for result in deliver(db, subscriptions, payload))
 
 
 def notify_new_task(db: Session, user_id: int, task_title: str, task_id: int):
@@ -109,7 +100,40 @@ def notify_task_updated(db: Session, user_id: int, task_title: str, task_id: int
     )
 
 
-def notify_new_message(db: Session, user_id: int, sender_name: str, content: str):
+def notify_task_due(db: Session, user_id: int, task_title: str, task_id: int):
+    """Send push when a task's due date arrives."""
+    send_push_notification(
+        db=db,
+        user_id=user_id,
+        title='⏰ Срок задачи',
+        body=task_title,
+        data={'type': 'task', 'task_id': task_id},
+        tag=f'task-{task_id}',
+    )
+
+
+def notify_tasks_bulk(db: Session, user_id: int, tasks: list[tuple[int, str]],
+                      assigned: bool, status: str = None):
+    """One push for many tasks changed at once (bulk update)."""
+    if assigned:
+        title = '📋 Новые задачи'
+    else:
+        title = f"{'✅' if status == 'done' else '📋'} Задачи обновлены"
+    names = ', '.join(name for _, name in tasks[:3])
+    if len(tasks) > 3:
+        names += f' и ещё {len(tasks) - 3}'
+    send_push_notification(
+        db=db,
+        user_id=user_id,
+        title=title,
+        body=f'{names} — {status}' if status else names,
+        data={'type': 'tasks', 'task_ids': [task_id for task_id, _ in tasks]},
+        tag='tasks-bulk',
+    )
+
+
+def notify_new_message(db: Session, user_id: int, sender_name: str, content: str,
+                       room: str = None, message_id: int = None):
     """Send push for new chat message."""
     preview = content[:50] + '...' if len(content) > 50 else content
     send_push_notification(
@@ -117,11 +141,41 @@ def notify_new_message(db: Session, user_id: int, sender_name: str, content: str
         user_id=user_id,
         title=f'💬 {sender_name}',
         body=preview,
-        data={'type': 'message'},
+        data={'type': 'message', 'room': room, 'message_id': message_id},
+        tag='chat',
+    )
+
+
+def notify_new_message_digest(db: Session, user_id: int, items: list[dict]):
+    """One push for a burst of chat messages (``notify_new_message`` arguments)."""
+    senders = list(dict.fromkeys(item['sender_name'] for item in items))
+    names = ', '.join(senders[:3])
+    if len(senders) > 3:
+        names += f' и ещё {len(senders) - 3}'
+    rooms = list(dict.fromkeys(item.get('room') for item in items))
+    send_push_notification(
+        db=db,
+        user_id=user_id,
+        title=f'💬 Новые сообщения: {len(items)}',
+        body=f'от {names}',
+        data={'type': 'message', 'room': rooms[0] if len(rooms) == 1 else None,
+              'message_id': items[-1].get('message_id')},
         tag='chat',
     )
 
 
+def notify_task_updated_digest(db: Session, user_id: int, items: list[dict]):
+    """One push for several status changes (``notify_task_updated`` arguments):
+    the latest state of each task."""
+    latest = {item['task_id']: item for item in items}
+    if len(latest) == 1:
+        notify_task_updated(db, **items[-1])
+        return
+    statuses = {item['status'] for item in latest.values()}
+    notify_tasks_bulk(db, user_id, [(item['task_id'], item['task_title']) for item in latest.values()],
+                      assigned=False, status=statuses.pop() if len(statuses) == 1 else None)
+
+
 def get_vapid_public_key() -> str:
     """Return public VAPID key for client subscription."""
     return VAPID_PUBLIC_KEY
@@ -0,0 +1,59 @@
+"""Read markers: per-user, per-room read position and unread count."""
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..models import Message, ReadMarker
+
+
+def load_room(db: Session, room: str) -> tuple[list[ReadMarker], list[tuple[int, int]], int]:
+    """A room's markers, the ``(id, sender)`` of messages newer than the
+    oldest ``counted_through`` (not yet in the stored counts), and the
+    room's newest message id."""
+    markers = db.query(ReadMarker).filter(ReadMarker.room == room).all()
+    since = min((m.counted_through for m in markers), default=None)
+    newer = []
+    if since is not None:
+        newer = [tuple(row) for row in (
+            db.query(Message.id, Message.sender)
+            .filter(Message.room == room, Message.id > since)
+            .order_by(Message.id)
+        )]
+    if newer:
+        last_id = newer[-1][0]
+    else:
+        last_id = db.query(func.max(Message.id)).filter(Message.room == room).scalar() or 0
+    return markers, newer, last_id
+
+
+def user_rooms(db: Session, user_id: int) -> list[str]:
+    return [room for (room,) in db.query(ReadMarker.room).filter(ReadMarker.user_id == user_id)]
+
+
+def count_unread(db: Session, room: str, user_id: int, after_id: int) -> int:
+    """Messages in ``room`` after ``after_id`` sent by someone else."""
+    return (db.query(func.count(Message.id))
+            .filter(Message.room == room, Message.id > after_id, Message.sender != user_id)
+            .scalar())
+
+
+def save_markers(db: Session, rows: list[dict]) -> None:
+    """Upsert ``{user_id, room, last_read_id, unread, counted_through}`` rows."""
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(ReadMarker).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id', 'room'],
+            set_={name: stmt.excluded[name] for name in ('last_read_id', 'unread', 'counted_through')}
+            | {'updated_at': func.now()},
+        )
+        db.execute(stmt)
+    else:
+        for row in rows:
+            db.merge(ReadMarker(**row))
+    db.commit()
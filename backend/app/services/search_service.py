@@ -0,0 +1,167 @@
+"""Full-text search over chat messages.
+
+SQLite uses an FTS5 external-content table kept in sync by triggers;
+PostgreSQL uses a stored ``tsvector`` column with a GIN index. Both are
+maintained by the database on every insert, update and delete, whichever
+code path writes the message.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from ..core.config import SEARCH_RANK_WINDOW
+from ..models import Message
+from .message_service import to_payloads
+
+# org_id (the room) is indexed too, so a room filter narrows the match
+# inside FTS5 instead of after it
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5("
+    "content, org_id, content='messages', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN "
+    "INSERT INTO messages_fts(rowid, content, org_id) VALUES (new.id, new.content, new.org_id); END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN "
+    "INSERT INTO messages_fts(messages_fts, rowid, content, org_id) "
+    "VALUES ('delete', old.id, old.content, old.org_id); END",
+    "CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF content, org_id ON messages BEGIN "
+    "INSERT INTO messages_fts(messages_fts, rowid, content, org_id) "
+    "VALUES ('delete', old.id, old.content, old.org_id); "
+    "INSERT INTO messages_fts(rowid, content, org_id) VALUES (new.id, new.content, new.org_id); END",
+]
+
+# 'simple' config: no stemming or stop words, the chat is multilingual
+POSTGRES_DDL = [
+    "ALTER TABLE messages ADD COLUMN IF NOT EXISTS content_tsv tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('simple', coalesce(content, ''))) STORED",
+]
+POSTGRES_INDEX = "CREATE INDEX {concurrently} IF NOT EXISTS ix_messages_content_tsv ON messages USING gin (content_tsv)"
+
+
+def ensure_index(conn: Connection) -> None:
+    """Create the search index if missing (idempotent, run at startup)."""
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'messages_fts'")).first()
+        for ddl in SQLITE_DDL:
+            conn.execute(text(ddl))
+        if not exists:
+            # Index the messages stored before search existed
+            conn.execute(text("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')"))
+    elif dialect == 'postgresql':
+        for ddl in POSTGRES_DDL:
+            conn.execute(text(ddl))
+        conn.execute(text(POSTGRES_INDEX.format(concurrently='')))
+
+
+def supported(db: Session) -> bool:
+    """Whether the database has a search index (SQLite FTS5 or PostgreSQL)."""
+    return db.get_bind().dialect.name in ('sqlite', 'postgresql')
+
+
+def _phrase(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _fts5_query(q: str, room: Optional[str] = None) -> str:
+    # Every word as a quoted phrase (implicitly ANDed): user input cannot
+    # inject FTS5 operators. The last word also matches as a prefix unless it
+    # is too short to be selective
+    raw = q.split()
+    if not raw:
+        return ''
+    words = [_phrase(w) for w in raw]
+    if len(raw[-1]) >= 3:
+        words[-1] += '*'
+    match = f'content : ({" ".join(words)})'
+    if room is not None and any(ch.isalnum() for ch in room):
+        # Prefilter only; the exact room comparison happens in SQL
+        match += f' AND org_id : ^{_phrase(room)}'
+    return match
+
+
+def encode_cursor(rank: float, message_id: int) -> str:
+    raw = json.dumps([rank, message_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple[float, int]:
+    """``(rank, id)`` of the last result of the previous page; ValueError if malformed."""
+    try:
+        rank, message_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return float(rank), int(message_id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+
+def search_messages(db: Session, q: str, room: Optional[str] = None,
+                    sender_id: Optional[int] = None, since: Optional[datetime] = None,
+                    until: Optional[datetime] = None, limit: int = 20,
+                    cursor: Optional[str] = None) -> tuple[list[dict], Optional[str]]:
+    """Best matches first, as ``MessageOut`` dicts plus the next page's cursor.
+
+    Results are ordered by ``(rank, id)`` where a lower rank is a better
+    match (BM25 / negated ``ts_rank_cd``), so the cursor is a plain keyset.
+    """
+    dialect = db.get_bind().dialect.name
+    params = {'limit': limit + 1}
+    if dialect == 'sqlite':
+        match = _fts5_query(q, room)
+        if not match:
+            return [], None
+        rank_expr = 'bm25(messages_fts, 1.0, 0.0)'
+        source = 'messages_fts JOIN messages m ON m.id = messages_fts.rowid'
+        newest_first = 'messages_fts.rowid DESC'  # FTS5 walks its doclists backwards
+        where = ['messages_fts MATCH :q']
+        params['q'] = match
+    elif dialect == 'postgresql':
+        rank_expr = "(-ts_rank_cd(m.content_tsv, websearch_to_tsquery('simple', :q)))::float8"
+        source = 'messages m'
+        newest_first = 'm.id DESC'
+        where = ["m.content_tsv @@ websearch_to_tsquery('simple', :q)"]
+        params['q'] = q
+    else:
+        raise ValueError(f'Message search is not supported on {dialect}')
+
+    if room is not None:
+        where.append('m.org_id = :room')
+        params['room'] = room
+    if sender_id is not None:
+        where.append('m.sender = :sender_id')
+        params['sender_id'] = sender_id
+    if since is not None:
+        where.append('m.created_at >= :since')
+        params['since'] = since
+    if until is not None:
+        where.append('m.created_at < :until')
+        params['until'] = until
+    # Rank only the newest SEARCH_RANK_WINDOW matches: scoring every match of
+    # a very common word costs seconds on millions of messages, and in a chat
+    # the best of the recent matches is what people look for
+    params['window'] = SEARCH_RANK_WINDOW
+    candidates = (f'SELECT m.id AS id, {rank_expr} AS rank FROM {source} '
+                  f'WHERE {" AND ".join(where)} ORDER BY {newest_first} LIMIT :window')
+    outer = ''
+    if cursor is not None:
+        params['after_rank'], params['after_id'] = decode_cursor(cursor)
+        outer = 'WHERE rank > :after_rank OR (rank = :after_rank AND id > :after_id) '
+    sql = f'SELECT id, rank FROM ({candidates}) AS c {outer}ORDER BY rank, id LIMIT :limit'
+    stmt = text(sql)
+    dates = [bindparam(name, type_=Message.created_at.type) for name in ('since', 'until') if name in params]
+    if dates:
+        stmt = stmt.bindparams(*dates)
+    hits = db.execute(stmt, params).all()
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        next_cursor = encode_cursor(hits[-1].rank, hits[-1].id)
+    if not hits:
+        return [], None
+    by_id = {m.id: m for m in db.query(Message).filter(Message.id.in_([h.id for h in hits]))}
+    msgs = [by_id[h.id] for h in hits if h.id in by_id]
+    return to_payloads(db, msgs), next_cursor
@@ -0,0 +1,212 @@
+"""Delta sync: what changed in messages, tasks and attachments since a cursor.
+
+Triggers on the three tables record every insert, update and delete in
+``changes`` (one row per entity, moved to a new ``seq`` on each change), so
+every write path is covered, including bulk inserts and admin scripts.
+
+On SQLite writers are serialised, so ``seq`` order is commit order. On
+PostgreSQL a transaction can take a lower ``seq`` and commit after a higher
+one; each change therefore also records its transaction id, the feed is
+ordered by ``(txid, seq)`` and only hands out transactions older than every
+one still running, so a cursor never skips a late commit.
+
+The newest change of an entity type doubles as the version of that
+collection, used for ETags (``collection_version``).
+"""
+import base64
+import binascii
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from ..models import Attachment, Message, Task
+from .message_service import to_payloads
+
+# table -> entity name in the feed
+TABLES = {'messages': 'message', 'tasks': 'task', 'attachments': 'attachment'}
+# Tracked for collection versions only, not part of the feed
+VERSIONED_TABLES = {'users': 'user', 'push_subscriptions': 'push_subscription'}
+IN_FEED = "entity IN (" + ", ".join(f"'{entity}'" for entity in TABLES.values()) + ")"
+
+SQLITE_TRIGGER = (
+    "CREATE TRIGGER IF NOT EXISTS changes_{table}_{name} AFTER {event} ON {table} BEGIN "
+    "INSERT OR REPLACE INTO changes(entity, entity_id, op) VALUES ('{entity}', {row}.id, '{op}'); END"
+)
+
+POSTGRES_FUNCTION = """
+CREATE OR REPLACE FUNCTION record_change() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO changes (entity, entity_id, op, txid)
+    VALUES (TG_ARGV[0],
+            CASE WHEN TG_OP = 'DELETE' THEN OLD.id ELSE NEW.id END,
+            CASE WHEN TG_OP = 'DELETE' THEN 'delete' ELSE 'upsert' END,
+            pg_current_xact_id()::text::bigint)
+    ON CONFLICT (entity, entity_id) DO UPDATE
+    SET seq = EXCLUDED.seq, op = EXCLUDED.op, txid = EXCLUDED.txid, changed_at = now();
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+POSTGRES_TRIGGER = (
+    "CREATE TRIGGER changes_{table} AFTER INSERT OR UPDATE OR DELETE ON {table} "
+    "FOR EACH ROW EXECUTE FUNCTION record_change('{entity}')"
+)
+# Everything below the oldest running transaction has committed (or rolled back)
+POSTGRES_HORIZON = "pg_snapshot_xmin(pg_current_snapshot())::text::bigint"
+
+
+def ensure_triggers(conn: Connection) -> None:
+    """Create the change triggers if missing (idempotent, run at startup).
+
+    On first creation, rows that already exist are recorded as upserts so a
+    first sync from the beginning returns them.
+    """
+    dialect = conn.dialect.name
+    tracked = {**TABLES, **VERSIONED_TABLES}
+    if dialect == 'sqlite':
+        new = not conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'changes_messages_insert'")).first()
+        for table, entity in tracked.items():
+            for event, row, op in (('INSERT', 'new', 'upsert'), ('UPDATE', 'new', 'upsert'), ('DELETE', 'old', 'delete')):
+                conn.execute(text(SQLITE_TRIGGER.format(
+                    table=table, name=event.lower(), event=event, entity=entity, row=row, op=op)))
+    elif dialect == 'postgresql':
+        existing = {name for (name,) in conn.execute(text("SELECT tgname FROM pg_trigger WHERE tgname LIKE 'changes_%'"))}
+        new = 'changes_messages' not in existing
+        conn.execute(text(POSTGRES_FUNCTION))
+        for table, entity in tracked.items():
+            if f'changes_{table}' not in existing:
+                conn.execute(text(POSTGRES_TRIGGER.format(table=table, entity=entity)))
+    else:
+        return
+    if new:
+        for table, entity in TABLES.items():
+            conn.execute(text(
+                f"INSERT INTO changes (entity, entity_id, op) SELECT '{entity}', id, 'upsert' FROM {table} "
+                f"WHERE id NOT IN (SELECT entity_id FROM changes WHERE entity = '{entity}') ORDER BY id"
+            ))
+
+
+def encode_cursor(txid: int, seq: int) -> str:
+    return base64.urlsafe_b64encode(f"c1:{txid}:{seq}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[int, int]:
+    """``(txid, seq)`` from ``encode_cursor``; ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    parts = raw.split(":")
+    if len(parts) != 3 or parts[0] != "c1" or not all(p.isdigit() for p in parts[1:]):
+        raise ValueError("Invalid cursor")
+    return int(parts[1]), int(parts[2])
+
+
+def _horizon(db: Session) -> Optional[str]:
+    return POSTGRES_HORIZON if db.get_bind().dialect.name == 'postgresql' else None
+
+
+def head(db: Session) -> str:
+    """Cursor at the newest change: start of an incremental sync after a full load."""
+    horizon = _horizon(db)
+    where = f"AND txid < {horizon} " if horizon else ""
+    row = db.execute(text(
+        f"SELECT txid, seq FROM changes WHERE {IN_FEED} {where}"
+        "ORDER BY txid DESC, seq DESC LIMIT 1"
+    )).first()
+    return encode_cursor(*row) if row else encode_cursor(0, 0)
+
+
+def collection_version(db: Session, *entities: str) -> str:
+    """Opaque token that changes whenever a row of these entity types is
+    written: the newest change of each, one index lookup apiece."""
+    horizon = _horizon(db)
+    stable = f" AND txid < {horizon}" if horizon else ""
+    columns = ", ".join(
+        f"(SELECT txid || '.' || seq FROM changes WHERE entity = :e{i}{stable} "
+        f"ORDER BY txid DESC, seq DESC LIMIT 1)"
+        for i in range(len(entities))
+    )
+    row = db.execute(text(f"SELECT {columns}"), {f"e{i}": e for i, e in enumerate(entities)}).one()
+    return "-".join(value or "0" for value in row)
+
+
+def _task(t: Task) -> dict:
+    return {
+        "id": t.id,
+        "title": t.title,
+        "description": t.description or "",
+        "status": t.status.value if t.status else "open",
+        "creator": t.creator,
+        "assigned_to": t.assigned_to,
+        "due_date": t.due_date.isoformat() if t.due_date else None,
+        "created_at": t.created_at.isoformat() if t.created_at else None,
+    }
+
+
+def _attachment(a: Attachment) -> dict:
+    return {
+        "id": a.id,
+        "original_name": a.original_name,
+        "file_type": a.file_type,
+        "size": a.size,
+        "message_id": a.message_id,
+        "task_id": a.task_id,
+        "url": f"/api/v1/files/{a.id}",
+        "thumbnail_url": f"/api/v1/files/{a.id}/thumb" if a.file_type == 'image' else None,
+    }
+
+
+def changes_since(db: Session, cursor: Optional[str] = None, limit: int = 500) -> dict:
+    """Up to ``limit`` changes after ``cursor`` (from the beginning if None).
+
+    Returns current rows of changed entities under ``messages``/``tasks``/
+    ``attachments``, ids of deleted ones under ``deleted`` (archived tasks
+    count as deleted, they leave the task list), the ``cursor`` to pass next
+    time and whether ``more`` changes are waiting.
+    """
+    txid, seq = decode_cursor(cursor) if cursor else (0, 0)
+    where = f"(txid > :txid OR (txid = :txid AND seq > :seq)) AND {IN_FEED}"
+    horizon = _horizon(db)
+    if horizon:
+        where += f" AND txid < {horizon}"
+    rows = db.execute(
+        text(f"SELECT txid, seq, entity, entity_id, op FROM changes WHERE {where} ORDER BY txid, seq LIMIT :limit"),
+        {"txid": txid, "seq": seq, "limit": limit + 1},
+    ).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    changed: dict[str, list[int]] = {entity: [] for entity in TABLES.values()}
+    deleted: dict[str, list[int]] = {entity: [] for entity in TABLES.values()}
+    for row in rows:
+        (deleted if row.op == 'delete' else changed)[row.entity].append(row.entity_id)
+
+    messages = tasks = attachments = []
+    if changed['message']:
+        found = db.query(Message).filter(Message.id.in_(changed['message'])).order_by(Message.id).all()
+        messages = to_payloads(db, found)
+        deleted['message'] += sorted(set(changed['message']) - {m.id for m in found})
+    if changed['task']:
+        found = db.query(Task).filter(Task.id.in_(changed['task'])).order_by(Task.id).all()
+        tasks = [_task(t) for t in found if not t.archived]
+        deleted['task'] += sorted(set(changed['task']) - {t.id for t in found if not t.archived})
+    if changed['attachment']:
+        found = db.query(Attachment).filter(Attachment.id.in_(changed['attachment'])).order_by(Attachment.id).all()
+        attachments = [_attachment(a) for a in found]
+        deleted['attachment'] += sorted(set(changed['attachment']) - {a.id for a in found})
+
+    return {
+        "messages": messages,
+        "tasks": tasks,
+        "attachments": attachments,
+        "deleted": {
+            "messages": deleted['message'],
+            "tasks": deleted['task'],
+            "attachments": deleted['attachment'],
+        },
+        "cursor": encode_cursor(rows[-1].txid, rows[-1].seq) if rows else (cursor or encode_cursor(0, 0)),
+        "more": more,
+    }
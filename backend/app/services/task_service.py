@@ -1,8 +1,32 @@
+import base64
+import binascii
+
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from ..models import Task, TaskStatus
-from datetime import datetime
+from ..models import Task, TaskReminder, TaskStatus
+from . import outbox_service
+from datetime import datetime, timezone
 from typing import Optional
 
+# Socket events and pushes go through the outbox: stored in the same
+# transaction as the change, sent by the dispatcher after commit
+
+def utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """Due dates are stored as naive UTC."""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+def _announce_assigned(db: Session, task: Task, actor_id: Optional[int]):
+    outbox_service.add_emit(db, 'task_assigned', {'id': task.id, 'title': task.title},
+                            room=f'user_{task.assigned_to}')
+    if task.assigned_to != actor_id:
+        outbox_service.add_push(db, 'new_task', user_id=task.assigned_to,
+                                task_title=task.title, task_id=task.id)
+
 def create_task(db: Session, title: str, description: str, creator_id: int, 
                 assigned_to: Optional[int] = None, due_date: Optional[datetime] = None) -> Task:
     task = Task(
@@ -10,10 +34,15 @@ def create_task(db: Session, title: str, description: str, creator_id: int,
         description=description,
         creator=creator_id,
         assigned_to=assigned_to,
-        due_date=due_date,
+        due_date=utc_naive(due_date),
         status=TaskStatus.open
     )
     db.add(task)
+    db.flush()
+    outbox_service.add_emit(db, 'task_created', {'id': task.id, 'title': task.title, 'assigned_to': assigned_to,
+                                                 'due_date': _iso(task.due_date)})
+    if assigned_to:
+        _announce_assigned(db, task, creator_id)
     db.commit()
     db.refresh(task)
     return task
@@ -21,23 +50,49 @@ def create_task(db: Session, title: str, description: str, creator_id: int,
 def get_task(db: Session, task_id: int) -> Optional[Task]:
     return db.query(Task).filter(Task.id == task_id, Task.archived == False).first()
 
+def encode_cursor(task_id: int) -> str:
+    """Opaque cursor pointing just after ``task_id`` in the newest-first listing."""
+    return base64.urlsafe_b64encode(f"t1:{task_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Task id from ``encode_cursor``; ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    version, _, task_id = raw.partition(":")
+    if version != "t1" or not task_id.isdigit():
+        raise ValueError("Invalid cursor")
+    return int(task_id)
+
+
 def list_tasks(db: Session, assigned_to: Optional[int] = None, status: Optional[str] = None,
                date_from: Optional[datetime] = None, date_to: Optional[datetime] = None,
-               limit: int = 50, offset: int = 0) -> list[Task]:
+               limit: int = 50, offset: int = 0, before_id: Optional[int] = None) -> list[Task]:
+    """Non-archived tasks, newest first.
+
+    ``created_at`` is only ever set on insert, so id order is creation order;
+    paging by ``before_id`` (keyset) stays fast at any depth, ``offset`` does not.
+    """
     query = db.query(Task).filter(Task.archived == False)
     if assigned_to is not None:
         query = query.filter(Task.assigned_to == assigned_to)
     if status is not None:
         query = query.filter(Task.status == status)
     if date_from is not None:
-        query = query.filter(Task.due_date >= date_from)
+        query = query.filter(Task.due_date >= utc_naive(date_from))
     if date_to is not None:
-        query = query.filter(Task.due_date <= date_to)
-    return query.order_by(Task.created_at.desc()).offset(offset).limit(limit).all()
+        query = query.filter(Task.due_date <= utc_naive(date_to))
+    if before_id is not None:
+        query = query.filter(Task.id < before_id)
+    return query.order_by(Task.id.desc()).offset(offset).limit(limit).all()
 
 def update_task(db: Session, task: Task, status: Optional[str] = None, 
                 assigned_to: Optional[int] = None, title: Optional[str] = None,
-                description: Optional[str] = None) -> Task:
+                description: Optional[str] = None, actor_id: Optional[int] = None) -> Task:
+    status_changed = status is not None and status != getattr(task.status, 'value', task.status)
+    reassigned = assigned_to is not None and assigned_to != task.assigned_to
     if status is not None:
         task.status = status
     if assigned_to is not None:
@@ -46,10 +101,90 @@ def update_task(db: Session, task: Task, status: Optional[str] = None,
         task.title = title
     if description is not None:
         task.description = description
+    status_value = getattr(task.status, 'value', task.status)
+    outbox_service.add_emit(db, 'task_updated', {'id': task.id, 'status': status_value,
+                                                 'assigned_to': task.assigned_to, 'due_date': _iso(task.due_date)})
+    if reassigned:
+        _announce_assigned(db, task, actor_id)
+    elif status_changed and task.assigned_to and task.assigned_to != actor_id:
+        outbox_service.add_push(db, 'task_updated', user_id=task.assigned_to,
+                                task_title=task.title, task_id=task.id, status=status_value)
     db.commit()
     db.refresh(task)
     return task
 
+def get_tasks_brief(db: Session, task_ids: list[int], include_archived: bool = False) -> list:
+    """``(id, title, assigned_to)`` rows of the given tasks, in one query."""
+    query = db.query(Task.id, Task.title, Task.assigned_to).filter(Task.id.in_(task_ids))
+    if not include_archived:
+        query = query.filter(Task.archived == False)
+    return query.all()
+
+def update_tasks(db: Session, tasks: list, status: Optional[str] = None,
+                 assigned_to: Optional[int] = None, archived: Optional[bool] = None,
+                 actor_id: Optional[int] = None) -> int:
+    """Apply the same changes to many tasks (``get_tasks_brief`` rows) in one
+    UPDATE and one commit, announced by one ``tasks_updated`` event and one
+    push per previous or new assignee."""
+    task_ids = [t.id for t in tasks]
+    values = {}
+    if status is not None:
+        values[Task.status] = status
+    if assigned_to is not None:
+        values[Task.assigned_to] = assigned_to
+    if archived is not None:
+        values[Task.archived] = archived
+    count = db.query(Task).filter(Task.id.in_(task_ids)).update(values, synchronize_session=False)
+
+    changes = {name: value for name, value in
+               (('status', status), ('assigned_to', assigned_to), ('archived', archived)) if value is not None}
+    outbox_service.add_emit(db, 'tasks_updated', {'ids': task_ids, **changes})
+    recipients: dict[int, list[tuple[int, str]]] = {}
+    for t in tasks:
+        for user_id in {t.assigned_to, assigned_to}:
+            if user_id is not None and user_id != actor_id:
+                recipients.setdefault(user_id, []).append((t.id, t.title))
+    for user_id, changed in recipients.items():
+        outbox_service.add_push(db, 'tasks_bulk', user_id=user_id, tasks=changed,
+                                assigned=user_id == assigned_to, status=status)
+    db.commit()
+    return count
+
 def delete_task(db: Session, task: Task) -> None:
+    outbox_service.add_emit(db, 'task_deleted', {'id': task.id})
+    # SQLite does not enforce the cascade
+    db.query(TaskReminder).filter(TaskReminder.task_id == task.id).delete(synchronize_session=False)
     db.delete(task)
     db.commit()
+
+def upcoming_due(db: Session, since: datetime, task_ids: Optional[list[int]] = None) -> list[tuple[int, datetime]]:
+    """``(id, due_date)`` of open, non-archived tasks due at or after ``since``."""
+    query = db.query(Task.id, Task.due_date).filter(
+        Task.archived == False, Task.status != TaskStatus.done, Task.due_date >= since)
+    if task_ids is not None:
+        query = query.filter(Task.id.in_(task_ids))
+    return [tuple(row) for row in query]
+
+def fire_reminder(db: Session, task_id: int, due_date: datetime) -> bool:
+    """Send the ``task_due`` event and push for a task (via the outbox), once.
+
+    Returns False if the task no longer has this due date, is done or
+    archived, or another worker already sent the reminder.
+    """
+    task = db.query(Task).filter(Task.id == task_id).first()
+    if (task is None or task.archived or task.status == TaskStatus.done
+            or task.due_date is None or utc_naive(task.due_date) != due_date):
+        return False
+    db.add(TaskReminder(task_id=task_id, due_date=due_date))
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        return False
+    payload = {'id': task.id, 'title': task.title, 'due_date': _iso(task.due_date), 'assigned_to': task.assigned_to}
+    recipient = task.assigned_to or task.creator
+    outbox_service.add_emit(db, 'task_due', payload, room=f'user_{recipient}' if recipient else None)
+    if recipient:
+        outbox_service.add_push(db, 'task_due', user_id=recipient, task_title=task.title, task_id=task.id)
+    db.commit()
+    return True
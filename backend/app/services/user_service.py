@@ -0,0 +1,64 @@
+from sqlalchemy.orm import Session
+from typing import Iterable, Optional
+
+from ..core.cache import LRUCache
+from ..core.config import IDENTITY_CACHE_SIZE, IDENTITY_CACHE_TTL, USERNAME_CACHE_SIZE
+from ..models import User
+
+# user_id -> detached User with id/username/role only. Entries are dropped on
+# role change/deletion, on other workers through the identity_invalidated signal;
+# the TTL only bounds staleness if that signal is lost.
+identity_cache = LRUCache(maxsize=IDENTITY_CACHE_SIZE, ttl=IDENTITY_CACHE_TTL)
+
+# user_id -> username for rendering messages. Usernames cannot be changed,
+# so entries only go away on eviction or user deletion.
+username_cache = LRUCache(maxsize=USERNAME_CACHE_SIZE)
+
+
+def get_identity(db: Session, user_id: int) -> Optional[User]:
+    """Return the authenticated user's identity, from cache when possible.
+
+    The result is a transient ``User`` (not attached to ``db``) carrying
+    ``id``, ``username`` and ``role`` - enough for auth and permission checks.
+    """
+    identity = identity_cache.get(user_id)
+    if identity is not None:
+        return identity
+    return load_identity(db, user_id)
+
+
+def load_identity(db: Session, user_id: int) -> Optional[User]:
+    """Read the identity from the database and cache it."""
+    row = db.query(User.id, User.username, User.role).filter(User.id == user_id).first()
+    if row is None:
+        return None
+    identity = User(id=row.id, username=row.username, role=row.role)
+    identity_cache.set(user_id, identity)
+    username_cache.set(user_id, row.username)
+    return identity
+
+
+def invalidate_identity(user_id: int) -> None:
+    identity_cache.invalidate(user_id)
+
+
+def get_usernames(db: Session, user_ids: Iterable[int]) -> dict[int, str]:
+    """``{user_id: username}`` for existing users, with one query for all cache misses."""
+    found, missing = {}, []
+    for user_id in set(user_ids):
+        if user_id is None:
+            continue
+        username = username_cache.get(user_id)
+        if username is None:
+            missing.append(user_id)
+        else:
+            found[user_id] = username
+    if missing:
+        for user_id, username in db.query(User.id, User.username).filter(User.id.in_(missing)):
+            username_cache.set(user_id, username)
+            found[user_id] = username
+    return found
+
+
+def invalidate_username(user_id: int) -> None:
+    username_cache.invalidate(user_id)
@@ -1,14 +1,155 @@
 """Socket.IO event handlers with JWT authentication."""
+import asyncio
+
 import socketio
-from .db import SessionLocal
-from .models import User, Message
+from .models import User
 from .core.security import decode_token
+from .core.config import SOCKETIO_MESSAGE_QUEUE, SOCKETIO_CHANNEL, REPLAY_MAX
+from .realtime.pubsub import create_client_manager
+from .realtime.persistence import socket_db
+from .realtime.loopmonitor import loop_monitor
+from .realtime.writebehind import MessageWriter
+from .realtime.outbox import OutboxDispatcher
+from .realtime.history import room_history
+from .realtime.presence import presence
+from .realtime.push_coalescer import PushCoalescer
+from .realtime.reminders import ReminderScheduler
+from .realtime.unread import unread_tracker
 from .services import message_service
+from .services.user_service import identity_cache, invalidate_identity, invalidate_username, load_identity
+from .realtime.typing_indicators import typing_tracker
+from .realtime.outbound import outbound
+
+# With SOCKETIO_MESSAGE_QUEUE set, emits go through the queue and reach
+# sockets held by every worker, not only the current process
+sio = socketio.AsyncServer(
+    async_mode='asgi',
+    cors_allowed_origins='*',
+    client_manager=create_client_manager(SOCKETIO_MESSAGE_QUEUE, channel=SOCKETIO_CHANNEL),
+)
+
+# Bounded per-connection send queues and the stalled/idle connection reaper
+outbound.attach(sio.eio)
+
+
+def _last_seen(eio_sid: str) -> float | None:
+    session = presence.sessions.get(sio.manager.sid_from_eio_sid(eio_sid, '/'))
+    return session.last_seen if session else None
+
+
+outbound.last_seen = _last_seen
+
+# Holds pushes per user for a short window and sends one digest
+push_coalescer = PushCoalescer(socket_db)
+
+
+def _unread_only(user_id: int, items: list[dict]) -> list[dict]:
+    # Messages read (on any worker) while the push was held need no push
+    return [item for item in items
+            if item['message_id'] > (unread_tracker.last_read(user_id, item['room']) or 0)]
+
+
+push_coalescer.filters['new_message'] = _unread_only
+
+
+async def _queue_chat_pushes(payload: dict):
+    """Chat push to room members (users with a read marker there) who are offline."""
+    room = payload['room']
+    try:
+        readers = unread_tracker.readers(None, room)
+        if readers is None:
+            readers = await socket_db.run(unread_tracker.readers, room)
+    except Exception as e:
+        print(f"[Push] Loading readers of {room} failed: {e}")
+        return
+    for user_id, last_read_id in readers.items():
+        if user_id != payload['sender_id'] and last_read_id < payload['id'] and not presence.is_online(user_id):
+            push_coalescer.add('new_message', {
+                'user_id': user_id, 'sender_name': payload['sender_username'],
+                'content': payload['content'], 'room': room, 'message_id': payload['id'],
+            })
+
+
+async def _emit_stored(event: str, data: dict, room: str | None = None):
+    """Emit an event for a stored write; new messages also queue chat pushes
+    (here, on the one worker that stored them, not in a tap on every worker)."""
+    await sio.emit(event, data, room=room)
+    if event == 'new_message':
+        task = asyncio.create_task(_queue_chat_pushes(data))
+        _chat_push_tasks.add(task)
+        task.add_done_callback(_chat_push_tasks.discard)
+
+
+_chat_push_tasks: set[asyncio.Task] = set()
+
+
+async def wait_chat_pushes():
+    """Wait until chat pushes still being looked up reach the coalescer (shutdown)."""
+    if _chat_push_tasks:
+        await asyncio.gather(*_chat_push_tasks, return_exceptions=True)
+
+
+# Group-commits chat messages and broadcasts them once stored
+message_writer = MessageWriter(socket_db, _emit_stored)
+
+# Sends the task/message events and pushes that REST writes leave in the outbox
+outbox_dispatcher = OutboxDispatcher(socket_db, _emit_stored, coalescer=push_coalescer)
+
+# Fires task_due reminders; follows task changes through the taps below
+reminder_scheduler = ReminderScheduler(socket_db)
+
+
+def _on_new_message(payload: dict):
+    room_history.add(payload)
+    message_service.first_page_cache.add(payload['room'], payload)
+    unread_tracker.on_message(payload)
+
+
+def _on_message_deleted(data: dict):
+    room_history.remove(data['room'], data['id'])
+    message_service.first_page_cache.remove(data['room'], data['id'])
+    unread_tracker.on_deleted(data)
+
+
+# Every worker sees all broadcast writes: keeps replay buffers, the
+# first-page cache and unread counts current for messages stored by other
+# workers, and read markers moved on other workers
+sio.manager.tap('new_message', _on_new_message)
+sio.manager.tap('message_deleted', _on_message_deleted)
+sio.manager.tap('unread', unread_tracker.apply_read)
+# ... and every task change, whichever worker's outbox sent it
+sio.manager.tap('task_created', reminder_scheduler.on_task_changed)
+sio.manager.tap('task_updated', reminder_scheduler.on_task_changed)
+sio.manager.tap('tasks_updated', reminder_scheduler.on_tasks_updated)
+sio.manager.tap('task_deleted', reminder_scheduler.on_task_deleted)
+
+
+def _on_identity_invalidated(data: dict):
+    invalidate_identity(data['user_id'])
+    if data.get('deleted'):
+        # Their messages now render as "deleted"
+        invalidate_username(data['user_id'])
+        message_service.first_page_cache.clear()
+        unread_tracker.forget_user(data['user_id'])
+
+
+# Role changes and deletions reach every worker's identity cache at once, so
+# a demoted admin loses admin rights everywhere, not after the cache TTL
+sio.manager.on_signal('identity_invalidated', _on_identity_invalidated)
 
-sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
 
-# Connected users: sid -> user_id
-connected_users: dict[str, int] = {}
+async def _emit_presence_diff(diff: dict):
+    # Every worker computes the same host-wide diff, so only notify local sockets
+    await sio.emit('presence_diff', diff, ignore_queue=True)
+
+
+async def _emit_room_typing(update: dict):
+    await sio.emit('room_typing', update, room=update['room'])
+
+
+def _load_missed(db, room: str, last_seen_id: int) -> tuple[list[dict], bool]:
+    msgs = message_service.get_messages_after(db, room, last_seen_id, REPLAY_MAX + 1)
+    return message_service.to_payloads(db, msgs[:REPLAY_MAX]), len(msgs) > REPLAY_MAX
 
 
 async def get_user_from_token(token: str) -> User | None:
@@ -19,14 +160,14 @@ async def get_user_from_token(token: str) -> User | None:
     user_id = payload.get('id')
     if not user_id:
         return None
-    db = SessionLocal()
-    try:
-        return db.query(User).filter(User.id == user_id).first()
-    finally:
-        db.close()
+    cached = identity_cache.get(user_id)
+    if cached is not None:
+        return cached
+    return await socket_db.run(load_identity, user_id)
 
 
 @sio.event
+@loop_monitor.track
 async def connect(sid, environ, auth):
     """Handle client connection with JWT auth."""
     token = auth.get('token') if auth else None
@@ -47,110 +188,140 @@ async def connect(sid, environ, auth):
         await sio.disconnect(sid)
         return False
     
-    connected_users[sid] = user.id
+    presence.add(sid, user.id, user.username)
+    presence.start(_emit_presence_diff)
+    outbound.start()
+    unread_tracker.start(socket_db.run)
     print(f"[Socket.IO] User {user.username} connected (sid={sid})")
     
     # Join user to their personal room for private notifications
     await sio.enter_room(sid, f"user_{user.id}")
     
-    # Broadcast online status
-    await sio.emit('user_online', {'user_id': user.id, 'username': user.username})
+    # Online status goes out with the next presence_diff
     return True
 
 
 @sio.event
+@loop_monitor.track
 async def disconnect(sid):
     """Handle client disconnect."""
-    user_id = connected_users.pop(sid, None)
-    if user_id:
-        await sio.emit('user_offline', {'user_id': user_id})
-        print(f"[Socket.IO] User {user_id} disconnected (sid={sid})")
+    session = presence.remove(sid)
+    if session:
+        typing_tracker.stop_user(session.user_id)
+        print(f"[Socket.IO] User {session.user_id} disconnected (sid={sid})")
 
 
 @sio.event
+@loop_monitor.track
 async def join_room(sid, data):
-    """Join a chat room."""
+    """Join a chat room; with ``last_seen_id``, replay the messages missed since."""
+    presence.touch(sid)
     room = data.get('room', 'general')
     await sio.enter_room(sid, room)
     await sio.emit('room_joined', {'room': room}, to=sid)
+    last_seen_id = data.get('last_seen_id')
+    if not isinstance(last_seen_id, int):
+        return
+    # Entered the room first: live messages may overlap the replay, clients dedupe by id
+    missed = room_history.since(room, last_seen_id)
+    truncated = False
+    if missed is None:
+        missed, truncated = await socket_db.run(_load_missed, room, last_seen_id)
+    await sio.emit('room_replay', {'room': room, 'messages': missed, 'truncated': truncated}, to=sid)
 
 
 @sio.event
+@loop_monitor.track
 async def leave_room(sid, data):
     """Leave a chat room."""
+    presence.touch(sid)
     room = data.get('room', 'general')
     await sio.leave_room(sid, room)
     await sio.emit('room_left', {'room': room}, to=sid)
 
 
+def _room_of(data) -> str | None:
+    """The event's room (default ``general``), or None for a payload that
+    is not a dict or a room that is not a name (rooms are ``String(128)``)."""
+    if not isinstance(data, dict):
+        return None
+    room = data.get('room', 'general')
+    if not isinstance(room, str) or not room or len(room) > 128:
+        return None
+    return room
+
+
 @sio.event
+@loop_monitor.track
 async def send_message(sid, data):
     """Handle incoming chat message."""
-    user_id = connected_users.get(sid)
-    if not user_id:
+    session = presence.touch(sid)
+    if not session:
         return
-    
-    content = data.get('content', '').strip()
-    room = data.get('room', 'general')
+    user_id = session.user_id
+    room = _room_of(data)
+    if room is None:
+        await sio.emit('message_error', {'error': 'Invalid message'}, to=sid)
+        return
+
+    content = data.get('content', '')
     reply_to = data.get('reply_to')
-    
+    if not isinstance(content, str) or (reply_to is not None and (type(reply_to) is not int or reply_to <= 0)):
+        await sio.emit('message_error', {'error': 'Invalid message'}, to=sid)
+        return
+    content = content.strip()
     if not content:
         return
-    
-    # Save message to DB
-    db = SessionLocal()
-    try:
-        msg = message_service.create_message(
-            db, 
-            sender_id=user_id, 
-            content=content, 
-            room=room,
-            reply_to=reply_to
-        )
-        user = db.query(User).filter(User.id == user_id).first()
-        
-        # Broadcast to room
-        await sio.emit('new_message', {
-            'id': msg.id,
-            'sender_id': user_id,
-            'sender_username': user.username if user else 'unknown',
-            'content': msg.content,
-            'room': msg.room,
-            'reply_to': msg.reply_to,
-            'created_at': msg.created_at.isoformat(),
-        }, room=room)
-    finally:
-        db.close()
+
+    typing_tracker.stop(room, user_id)
+    # Stored with the next batch, then broadcast to room with its id
+    message_writer.submit(user_id, content, room=room, reply_to=reply_to)
+
+
+@sio.event
+@loop_monitor.track
+async def mark_read(sid, data):
+    """Move the user's read marker in a room up to ``message_id``."""
+    session = presence.touch(sid)
+    if not session:
+        return
+    room = _room_of(data)
+    if room is None:
+        return
+    message_id = data.get('message_id')
+    if type(message_id) is not int or message_id <= 0:
+        return
+    last_read_id, unread = await socket_db.run(unread_tracker.mark_read, session.user_id, room, message_id)
+    await emit_read(session.user_id, room, last_read_id, unread)
 
 
 @sio.event
+@loop_monitor.track
 async def typing(sid, data):
-    """Broadcast typing indicator."""
-    user_id = connected_users.get(sid)
-    if not user_id:
+    """Record typing; the room gets an aggregated room_typing update per interval."""
+    session = presence.touch(sid)
+    if not session:
         return
-    room = data.get('room', 'general')
-    await sio.emit('user_typing', {'user_id': user_id, 'room': room}, room=room, skip_sid=sid)
-
-
-async def emit_task_created(task_id: int, title: str, assigned_to: int | None):
-    """Emit task created event (called from task service)."""
-    await sio.emit('task_created', {
-        'id': task_id,
-        'title': title,
-        'assigned_to': assigned_to
-    })
-    # Notify assigned user specifically
-    if assigned_to:
-        await sio.emit('task_assigned', {
-            'id': task_id,
-            'title': title
-        }, room=f"user_{assigned_to}")
-
-
-async def emit_task_updated(task_id: int, status: str, assigned_to: int | None):
-    """Emit task updated event."""
-    await sio.emit('task_updated', {
-        'id': task_id,
-        'status': status
-    })
+    room = _room_of(data)
+    if room is None:
+        return
+    typing_tracker.touch(room, session.user_id, session.username)
+    typing_tracker.start(_emit_room_typing)
+
+
+async def emit_read(user_id: int, room: str, last_read_id: int, unread: int):
+    """Tell the user's sockets (all tabs, every worker) about a moved read marker."""
+    await sio.emit('unread', {
+        'user_id': user_id,
+        'room': room,
+        'last_read_id': last_read_id,
+        'unread': unread,
+    }, room=f"user_{user_id}")
+
+
+async def signal_identity_invalidated(user_id: int, deleted: bool = False):
+    """Drop the user's cached identity (and, if deleted, username) on every worker.
+
+    A server-only signal: no client receives it.
+    """
+    await sio.manager.signal('identity_invalidated', {'user_id': user_id, 'deleted': deleted})
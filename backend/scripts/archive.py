@@ -4,6 +4,7 @@ import gzip
 from datetime import datetime, timedelta
 from app.db import SessionLocal
 from app.models import Message, Task
+from app.services.user_service import get_usernames
 
 ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', '/app/archives')
 
@@ -17,10 +18,11 @@ def archive_old():
         if not old_msgs and not old_tasks:
             print('Nothing to archive')
             return
+        usernames = get_usernames(db, (m.sender for m in old_msgs))
         date_tag = datetime.utcnow().strftime('%Y-%m-%d')
         out_path = os.path.join(ARCHIVE_DIR, f'archive-{date_tag}.json.gz')
         payload = {
-            'messages': [ { 'id': m.id, 'sender': m.sender, 'content': m.content, 'created_at': str(m.created_at) } for m in old_msgs],
+            'messages': [ { 'id': m.id, 'sender': m.sender, 'sender_username': usernames.get(m.sender, 'deleted'), 'content': m.content, 'created_at': str(m.created_at) } for m in old_msgs],
             'tasks': [ { 'id': t.id, 'title': t.title, 'description': t.description, 'created_at': str(t.created_at) } for t in old_tasks]
         }
         with gzip.open(out_path, 'wt', encoding='utf-8') as f:
@@ -0,0 +1,69 @@
+"""Room broadcast cost with 5k local clients: stock manager vs. encode-once path.
+
+Clients are real Engine.IO socket objects (without a transport), so both
+paths end with packets sitting in the sockets' outbound queues.
+
+Run from backend/:  python -m scripts.bench_broadcast --clients 5000
+"""
+import argparse
+import asyncio
+import time
+
+import socketio
+from engineio.async_socket import AsyncSocket
+from socketio.asyncio_manager import AsyncManager
+
+from app.realtime.broadcast import BroadcastManager
+
+ROOM = 'general'
+PAYLOADS = {
+    'new_message': {
+        'id': 1, 'sender_id': 1, 'sender_username': 'bench', 'content': 'x' * 200,
+        'room': ROOM, 'reply_to': None, 'created_at': '2026-01-01T00:00:00+00:00',
+    },
+    'presence_diff': {'online': [{'user_id': 7, 'username': 'bench'}], 'offline': [3]},
+    'task_created': {'id': 1, 'title': 'Prepare the report', 'assigned_to': 2},
+}
+
+
+async def run(manager, clients: int, emits: int) -> dict:
+    server = socketio.AsyncServer(async_mode='asgi', client_manager=manager)
+    sockets = []
+    for i in range(clients):
+        eio_sid = f'eio-{i}'
+        sock = AsyncSocket(server.eio, eio_sid)
+        server.eio.sockets[eio_sid] = sock
+        sockets.append(sock)
+        manager.enter_room(manager.connect(eio_sid, '/'), '/', ROOM)
+
+    results = {}
+    for event, payload in PAYLOADS.items():
+        start = time.perf_counter()
+        for _ in range(emits):
+            await server.emit(event, payload, room=ROOM)
+        elapsed = time.perf_counter() - start
+        for sock in sockets:
+            assert sock.queue.qsize() == emits
+            while not sock.queue.empty():
+                sock.queue.get_nowait()
+        results[event] = elapsed / emits
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=5000)
+    parser.add_argument('--emits', type=int, default=50)
+    args = parser.parse_args()
+
+    stock = asyncio.run(run(AsyncManager(), args.clients, args.emits))
+    fast = asyncio.run(run(BroadcastManager(), args.clients, args.emits))
+    print(f'{args.clients} clients, {args.emits} emits per event (ms per broadcast)')
+    print(f'{"event":<15}{"stock":>10}{"encode-once":>14}{"speedup":>10}')
+    for event in PAYLOADS:
+        print(f'{event:<15}{stock[event] * 1000:>10.2f}{fast[event] * 1000:>14.2f}'
+              f'{stock[event] / fast[event]:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
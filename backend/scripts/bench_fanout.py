@@ -0,0 +1,127 @@
+"""Broadcast throughput of the Unix-socket fan-out vs. number of workers.
+
+A fixed population of fake clients is split across N worker processes, each
+running its own Socket.IO server behind the Unix-socket manager. A separate
+publisher emits room broadcasts through the queue and every worker encodes
+and "sends" each packet to its local clients.
+
+Run from backend/:  python -m scripts.bench_fanout --workers 1 2 4
+"""
+import argparse
+import asyncio
+import multiprocessing as mp
+import os
+import shutil
+import tempfile
+import time
+
+import socketio
+
+from app.realtime.pubsub import UnixSocketBroadcastManager
+
+CHANNEL = 'bench'
+ROOM = 'general'
+
+
+class FakeSocket:
+    """Stands in for an Engine.IO socket; its queue just counts packets."""
+    closed = closing = False
+
+    def __init__(self, counter):
+        self.queue = self
+        self.counter = counter
+
+    def put_nowait(self, pkt):
+        pkt.encode()
+        self.counter()
+
+
+def worker(url: str, clients: int, messages: int, ready, results):
+    async def run():
+        mgr = UnixSocketBroadcastManager(url, channel=CHANNEL)
+        server = socketio.AsyncServer(async_mode='asgi', client_manager=mgr)
+        expected = clients * messages
+        delivered = 0
+        done = asyncio.Event()
+
+        def count():
+            nonlocal delivered
+            delivered += 1
+            if delivered == expected:
+                done.set()
+
+        for i in range(clients):
+            eio_sid = f'eio-{os.getpid()}-{i}'
+            server.eio.sockets[eio_sid] = FakeSocket(count)
+            sid = mgr.connect(eio_sid, '/')
+            mgr.enter_room(sid, '/', ROOM)
+        mgr.initialize()
+        while mgr._sock is None:
+            await asyncio.sleep(0.01)
+        ready.put(os.getpid())
+        await done.wait()
+        results.put(time.perf_counter())
+        mgr.thread.cancel()
+        mgr.close()
+
+    asyncio.run(run())
+
+
+async def publish(url: str, messages: int):
+    mgr = UnixSocketBroadcastManager(url, channel=CHANNEL, write_only=True)
+    mgr.set_server(socketio.AsyncServer(async_mode='asgi'))
+    payload = {
+        'id': 0, 'sender_id': 1, 'sender_username': 'bench',
+        'content': 'x' * 200, 'room': ROOM, 'reply_to': None,
+        'created_at': '2026-01-01T00:00:00',
+    }
+    for i in range(messages):
+        payload['id'] = i
+        await mgr.emit('new_message', payload, namespace='/', room=ROOM)
+    mgr.close()
+
+
+def bench(workers: int, clients: int, messages: int) -> float:
+    directory = tempfile.mkdtemp(prefix='bench-fanout-')
+    url = f'unix://{directory}'
+    ready, results = mp.Queue(), mp.Queue()
+    per_worker = clients // workers
+    procs = [
+        mp.Process(target=worker, args=(url, per_worker, messages, ready, results))
+        for _ in range(workers)
+    ]
+    try:
+        for p in procs:
+            p.start()
+        for _ in procs:
+            ready.get(timeout=30)
+        start = time.perf_counter()
+        asyncio.run(publish(url, messages))
+        finished = max(results.get(timeout=600) for _ in procs)
+        for p in procs:
+            p.join()
+    finally:
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+        shutil.rmtree(directory, ignore_errors=True)
+    return per_worker * workers * messages / (finished - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--clients', type=int, default=4000, help='total fake clients')
+    parser.add_argument('--messages', type=int, default=100, help='broadcasts to send')
+    args = parser.parse_args()
+
+    print(f'{args.clients} clients in room, {args.messages} broadcasts')
+    baseline = None
+    for n in args.workers:
+        rate = bench(n, args.clients, args.messages)
+        baseline = baseline or rate
+        print(f'workers={n:<3} {rate:>12,.0f} deliveries/s  x{rate / baseline:.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Scroll-back latency of message history: old query vs. keyset on (room, id).
+
+Fills a scratch SQLite file (or the database in $DATABASE_URL) with --rows
+messages spread over --rooms rooms, then times fetching one page at several
+depths of a room's history:
+
+  legacy  - what get_messages used to run: ``id < before_id`` ordered by
+            ``created_at``, without the composite index
+  keyset  - get_messages now: ``id < before_id`` ordered by ``id`` over
+            ``ix_messages_room_id``
+
+Run from backend/:  python -m scripts.bench_message_history --rows 10000000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = f'sqlite:///{tempfile.mkdtemp()}/bench.db'
+
+from sqlalchemy import text  # noqa: E402
+
+from app.db import Base, SessionLocal, engine  # noqa: E402
+from app.models import Message, User  # noqa: E402
+from app.services import message_service  # noqa: E402
+
+INDEX = next(i for i in Message.__table__.indexes if i.name == 'ix_messages_room_id')
+
+
+def populate(rows: int, rooms: int, batch: int = 100_000):
+    Base.metadata.create_all(bind=engine)
+    INDEX.drop(bind=engine)
+    start = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [{'username': 'bench', 'password_hash': 'x'}])
+        for offset in range(0, rows, batch):
+            conn.execute(Message.__table__.insert(), [{
+                'sender': 1,
+                'content': f'message {i}',
+                'org_id': f'room-{i % rooms}',
+                'created_at': start + timedelta(seconds=i),
+            } for i in range(offset, min(offset + batch, rows))])
+            print(f'\r  inserted {min(offset + batch, rows):,} rows', end='', flush=True)
+    print()
+
+
+def time_pages(query, room: str, cursors: list[int], repeat: int) -> list[float]:
+    """Median milliseconds per page at each cursor."""
+    db = SessionLocal()
+    try:
+        results = []
+        for before_id in cursors:
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                page = query(db, room, before_id)
+                samples.append((time.perf_counter() - started) * 1000)
+            assert page, f'empty page before {before_id}'
+            results.append(statistics.median(samples))
+        return results
+    finally:
+        db.close()
+
+
+def legacy(db, room: str, before_id: int, limit: int = 50):
+    return (db.query(Message).filter(Message.room == room, Message.id < before_id)
+            .order_by(Message.created_at.desc()).limit(limit).all()[::-1])
+
+
+def keyset(db, room: str, before_id: int, limit: int = 50):
+    return message_service.get_messages(db, room=room, limit=limit, before_id=before_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--rooms', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--legacy-repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f'Populating {args.rows:,} messages in {args.rooms} rooms')
+    started = time.perf_counter()
+    populate(args.rows, args.rooms)
+    print(f'  {time.perf_counter() - started:.1f}s')
+
+    room = 'room-0'
+    with engine.connect() as conn:
+        top = conn.execute(text('SELECT max(id) FROM messages')).scalar() + 1
+    depths = [0.0, 0.5, 0.99]
+    cursors = [int(top - d * (top - 1)) for d in depths]
+
+    old = time_pages(legacy, room, cursors, args.legacy_repeat)
+    started = time.perf_counter()
+    INDEX.create(bind=engine)
+    print(f'Built ix_messages_room_id in {time.perf_counter() - started:.1f}s')
+    new = time_pages(keyset, room, cursors, args.repeat)
+
+    print(f'\n{"depth":>7} {"legacy ms":>12} {"keyset ms":>12}')
+    for depth, a, b in zip(depths, old, new):
+        print(f'{depth:>7.0%} {a:>12.2f} {b:>12.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Message search: indexing throughput and query latency on a synthetic corpus.
+
+Generates --rows messages of 5-20 words drawn from a Zipf-distributed
+vocabulary (a few very common words, a long tail of rare ones) and stores
+them in a scratch SQLite file, or in the database in $DATABASE_URL
+(PostgreSQL gets the tsvector/GIN index). It reports:
+
+  * insert throughput without and with the search index being maintained
+  * median/p95 latency of search_service.search_messages for common, rare
+    and multi-word queries, with a room filter and for a deeper page
+
+Run from backend/:  python -m scripts.bench_message_search --rows 5000000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = f'sqlite:///{tempfile.mkdtemp()}/bench.db'
+
+from sqlalchemy import text  # noqa: E402
+
+from app.db import Base, SessionLocal, engine  # noqa: E402
+from app.models import Message, User  # noqa: E402
+from app.services import search_service  # noqa: E402
+
+VOCABULARY = 50_000
+
+
+def corpus(rows: int, rooms: int, seed: int = 1):
+    rnd = random.Random(seed)
+    words = [f'w{i}' for i in range(VOCABULARY)]
+    cum_weights = []
+    total = 0.0
+    for rank in range(1, VOCABULARY + 1):
+        total += 1 / rank
+        cum_weights.append(total)
+    for i in range(rows):
+        yield {
+            'sender': 1 + i % 10,
+            'content': ' '.join(rnd.choices(words, cum_weights=cum_weights, k=rnd.randint(5, 20))),
+            'org_id': f'room-{i % rooms}',
+        }
+
+
+def insert(rows: int, rooms: int, batch: int = 50_000) -> float:
+    """Insert the corpus; returns messages per second."""
+    started = time.perf_counter()
+    buffer = []
+    with engine.begin() as conn:
+        for row in corpus(rows, rooms):
+            buffer.append(row)
+            if len(buffer) == batch:
+                conn.execute(Message.__table__.insert(), buffer)
+                buffer.clear()
+        if buffer:
+            conn.execute(Message.__table__.insert(), buffer)
+    return rows / (time.perf_counter() - started)
+
+
+def reset():
+    Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text('DROP TABLE IF EXISTS messages_fts'))
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(),
+                     [{'id': i, 'username': f'user{i}', 'password_hash': 'x'} for i in range(1, 11)])
+
+
+def latency(repeat: int, **kwargs) -> tuple[float, float, int]:
+    """Median and p95 milliseconds, and the number of results of one call."""
+    db = SessionLocal()
+    try:
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            items, cursor = search_service.search_messages(db, **kwargs)
+            samples.append((time.perf_counter() - started) * 1000)
+        samples.sort()
+        return statistics.median(samples), samples[int(len(samples) * 0.95) - 1], len(items)
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--rooms', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    # Baseline: plain table, then the same corpus with the index maintained on insert
+    reset()
+    print(f'Inserting {args.rows:,} messages without search index ...')
+    plain = insert(args.rows, args.rooms)
+    reset()
+    with engine.begin() as conn:
+        search_service.ensure_index(conn)
+    print(f'Inserting {args.rows:,} messages with search index ...')
+    indexed = insert(args.rows, args.rooms)
+    print(f'  without index {plain:>10,.0f} msg/s')
+    print(f'  with index    {indexed:>10,.0f} msg/s  ({indexed / plain:.0%})')
+
+    db = SessionLocal()
+    _, deep_cursor = search_service.search_messages(db, 'w1', limit=500)
+    db.close()
+    queries = [
+        ('common word', dict(q='w1')),
+        ('mid-frequency word', dict(q='w500')),
+        ('rare word', dict(q='w40000')),
+        ('two words', dict(q='w3 w700')),
+        ('prefix', dict(q='w1234')),
+        ('common word, one room', dict(q='w1', room='room-3')),
+        ('common word, page 2 (after 500)', dict(q='w1', cursor=deep_cursor)),
+    ]
+    print(f'\n{"query":<34} {"median ms":>10} {"p95 ms":>10} {"hits":>6}')
+    for name, kwargs in queries:
+        median, p95, hits = latency(args.repeat, limit=20, **kwargs)
+        print(f'{name:<34} {median:>10.2f} {p95:>10.2f} {hits:>6}')
+
+
+if __name__ == '__main__':
+    main()
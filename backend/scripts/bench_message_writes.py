@@ -0,0 +1,92 @@
+"""Chat message insert throughput: per-message commit vs. write-behind batching.
+
+Simulates many concurrent senders against a scratch SQLite file (or the
+database in $DATABASE_URL). The per-message path is what send_message used
+to do: create_message (add + commit + refresh) for every message.
+
+Run from backend/:  python -m scripts.bench_message_writes --messages 5000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = f'sqlite:///{tempfile.mkdtemp()}/bench.db'
+
+from app.db import Base  # noqa: E402
+from app.models import User  # noqa: E402
+from app.realtime.persistence import SocketDB  # noqa: E402
+from app.realtime.writebehind import MessageWriter  # noqa: E402
+from app.services import message_service  # noqa: E402
+
+
+async def per_message(db: SocketDB, senders: int, messages: int) -> float:
+    queue = asyncio.Queue()
+    for i in range(messages):
+        queue.put_nowait(i)
+
+    async def sender():
+        while not queue.empty():
+            i = queue.get_nowait()
+            await db.run(message_service.create_message, sender_id=1,
+                         content=f'message {i}', room='bench')
+
+    start = time.perf_counter()
+    await asyncio.gather(*(sender() for _ in range(senders)))
+    return messages / (time.perf_counter() - start)
+
+
+async def write_behind(db: SocketDB, senders: int, messages: int, window_ms: float) -> float:
+    emitted = 0
+    done = asyncio.Event()
+
+    async def emit(event, payload, room=None):
+        nonlocal emitted
+        emitted += 1
+        if emitted == messages:
+            done.set()
+
+    writer = MessageWriter(db, emit, flush_window=window_ms / 1000)
+    per_sender = messages // senders
+
+    async def sender(n):
+        for i in range(per_sender):
+            writer.submit(1, f'message {n}-{i}', room='bench')
+            await asyncio.sleep(0)  # interleave like independent socket events
+
+    start = time.perf_counter()
+    await asyncio.gather(*(sender(n) for n in range(senders)))
+    await done.wait()
+    elapsed = time.perf_counter() - start
+    await writer.close()
+    print(f'  batches={writer.stats["batches"]} largest={writer.stats["largest_batch"]}')
+    return messages / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=5000)
+    parser.add_argument('--senders', type=int, default=50)
+    parser.add_argument('--window-ms', type=float, default=5)
+    args = parser.parse_args()
+    args.messages -= args.messages % args.senders
+
+    db = SocketDB(os.environ['DATABASE_URL'])
+    Base.metadata.create_all(bind=db.engine)
+    with db.Session() as s:
+        if not s.get(User, 1):
+            s.add(User(id=1, username='bench', password_hash='-'))
+            s.commit()
+
+    print(f'{args.messages} messages from {args.senders} senders on {db.engine.url}')
+    single = asyncio.run(per_message(db, args.senders, args.messages))
+    print(f'per-message commit: {single:>10,.0f} msg/s')
+    batched = asyncio.run(write_behind(db, args.senders, args.messages, args.window_ms))
+    print(f'write-behind:       {batched:>10,.0f} msg/s  x{batched / single:.1f}')
+    db.shutdown()
+
+
+if __name__ == '__main__':
+    main()
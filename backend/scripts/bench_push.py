@@ -0,0 +1,161 @@
+"""Web Push fan-out: one blocking webpush() after another vs. the pooled async sender.
+
+Starts the local push stand-in (scripts.push_standin) in a subprocess,
+stores --subscriptions push subscriptions with real P-256 keys in a scratch
+SQLite file (--gone of them expired, answered with 410), then sends one
+notification to all of them:
+
+  legacy  - what send_push_notification used to do: pywebpush.webpush per
+            subscription, a new HTTPS connection each time (timed on
+            --legacy-sample subscriptions and extrapolated)
+  pooled  - push_service.deliver: bounded concurrency over keep-alive
+            connections, one VAPID signature per push service origin,
+            expired subscriptions deleted afterwards
+
+One delivered push is decrypted again to check the encryption.
+
+Run from backend/:  python -m scripts.bench_push --subscriptions 10000
+"""
+import argparse
+import base64
+import json
+import multiprocessing as mp
+import os
+import tempfile
+import time
+import urllib.request
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from py_vapid import Vapid
+from py_vapid.utils import b64urlencode
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = f'sqlite:///{tempfile.mkdtemp()}/bench.db'
+if 'VAPID_PRIVATE_KEY' not in os.environ:
+    _vapid = Vapid()
+    _vapid.generate_keys()
+    os.environ['VAPID_PRIVATE_KEY'] = b64urlencode(
+        _vapid.private_key.private_numbers().private_value.to_bytes(32, 'big'))
+
+import http_ece  # noqa: E402
+from pywebpush import webpush  # noqa: E402
+
+from app.db import Base, SessionLocal, engine  # noqa: E402
+from app.models import PushSubscription, User  # noqa: E402
+from app.services import push_service  # noqa: E402
+from scripts.push_standin import make_app  # noqa: E402
+
+PAYLOAD = json.dumps({'title': '💬 bench', 'body': 'hello', 'icon': '/icons/icon-192.svg',
+                      'tag': 'chat', 'data': {'type': 'message'}})
+
+
+def serve(port: int, latency: float):
+    from aiohttp import web
+    web.run_app(make_app(latency), host='127.0.0.1', port=port, backlog=4096, print=None)
+
+
+def fetch(url: str):
+    with urllib.request.urlopen(url) as resp:
+        return resp.read()
+
+
+def populate(base: str, count: int, gone: int, users: int) -> dict[int, ec.EllipticCurvePrivateKey]:
+    """Subscriptions spread over ``users``; returns the receiver keys by id."""
+    Base.metadata.create_all(bind=engine)
+    keys = {}
+    db = SessionLocal()
+    try:
+        db.add_all(User(username=f'bench{i}', password_hash='x') for i in range(users))
+        db.flush()
+        user_ids = [u.id for u in db.query(User.id)]
+        for i in range(count):
+            key = ec.generate_private_key(ec.SECP256R1())
+            p256dh = key.public_key().public_bytes(
+                serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint)
+            token = f'gone-{i}' if i < gone else f'sub-{i}'
+            sub = PushSubscription(user_id=user_ids[i % users], endpoint=f'{base}/push/{token}',
+                                   p256dh=b64urlencode(p256dh), auth=b64urlencode(os.urandom(16)))
+            db.add(sub)
+            db.flush()
+            keys[sub.id] = key
+        db.commit()
+    finally:
+        db.close()
+    return keys
+
+
+def legacy(subscriptions) -> float:
+    started = time.perf_counter()
+    for sub in subscriptions:
+        try:
+            webpush(subscription_info={'endpoint': sub.endpoint, 'keys': {'p256dh': sub.p256dh, 'auth': sub.auth}},
+                    data=PAYLOAD, vapid_private_key=push_service.VAPID_PRIVATE_KEY,
+                    vapid_claims=dict(push_service.VAPID_CLAIMS))
+        except Exception:
+            pass
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--subscriptions', type=int, default=10_000)
+    parser.add_argument('--gone', type=int, default=100)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=20, help='stand-in response time, ms')
+    parser.add_argument('--legacy-sample', type=int, default=200)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    base = f'http://127.0.0.1:{args.port}'
+    server = mp.Process(target=serve, args=(args.port, args.latency / 1000), daemon=True)
+    server.start()
+    for _ in range(100):
+        try:
+            fetch(f'{base}/stats')
+            break
+        except OSError:
+            time.sleep(0.05)
+
+    print(f'Populating {args.subscriptions:,} subscriptions ({args.gone} expired)')
+    keys = populate(base, args.subscriptions, args.gone, args.users)
+    db = SessionLocal()
+    try:
+        subscriptions = db.query(PushSubscription).order_by(PushSubscription.id).all()
+        auths = {sub.id: sub.auth for sub in subscriptions}
+        sample = subscriptions[args.gone:args.gone + args.legacy_sample]
+        legacy_s = legacy(sample) / len(sample) * len(subscriptions)
+        legacy_stats = json.loads(fetch(f'{base}/stats'))
+
+        started = time.perf_counter()
+        results = push_service.deliver(db, subscriptions, PAYLOAD)
+        pooled_s = time.perf_counter() - started
+        signed = push_service.push_sender.stats['vapid_signed']
+        remaining = db.query(PushSubscription).count()
+    finally:
+        db.close()
+        push_service.push_sender.close()
+    stats = json.loads(fetch(f'{base}/stats'))
+
+    ok = next(r for r in results if r.ok)
+    body = base64.b64decode(fetch(f"{base}/last/{ok.endpoint.rsplit('/', 1)[1]}"))
+    auth = auths[ok.subscription_id]
+    auth = base64.urlsafe_b64decode(auth + '=' * (-len(auth) % 4))
+    decrypted = http_ece.decrypt(body, private_key=keys[ok.subscription_id], auth_secret=auth, version='aes128gcm')
+    assert decrypted.decode() == PAYLOAD, 'payload does not decrypt'
+    server.terminate()
+
+    n = len(results)
+    print(f'\n{"":<8} {"seconds":>9} {"pushes/s":>10} {"connections":>12}')
+    print(f'{"legacy":<8} {legacy_s:>9.2f} {n / legacy_s:>10,.0f} {legacy_stats["connections"]:>12,}'
+          f'  (extrapolated from {len(sample)})')
+    print(f'{"pooled":<8} {pooled_s:>9.2f} {n / pooled_s:>10,.0f} '
+          f'{stats["connections"] - legacy_stats["connections"]:>12,}')
+    print(f'\ndelivered {sum(r.ok for r in results):,}, gone {sum(r.gone for r in results):,} '
+          f'(deleted: {n - remaining:,}), other failures {sum(not r.ok and not r.gone for r in results):,}')
+    print(f'VAPID signatures: legacy {len(sample):,} (one per push), pooled {signed} for {n:,} pushes')
+    print('payload decrypts: ok')
+
+
+if __name__ == '__main__':
+    main()
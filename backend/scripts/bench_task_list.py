@@ -0,0 +1,123 @@
+"""Task listing latency: OFFSET paging vs. keyset on the composite indexes.
+
+Fills a scratch SQLite file (or the database in $DATABASE_URL) with --rows
+tasks (a few archived, spread over --users assignees and the statuses),
+then times one page of GET /api/v1/tasks at several depths, unfiltered, for
+one assignee and for one status:
+
+  legacy  - what list_tasks used to run: ORDER BY created_at DESC with
+            OFFSET, without the task indexes
+  offset  - ORDER BY id DESC with OFFSET, with the indexes
+  keyset  - list_tasks now: ``id < before_id`` over the indexes
+
+Run from backend/:  python -m scripts.bench_task_list --rows 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = f'sqlite:///{tempfile.mkdtemp()}/bench.db'
+
+from app.db import Base, SessionLocal, engine  # noqa: E402
+from app.models import Task, TaskStatus  # noqa: E402
+from app.services import task_service  # noqa: E402
+
+INDEXES = [i for i in Task.__table__.indexes if i.name.startswith('ix_tasks_') and i.name != 'ix_tasks_id']
+
+
+def populate(rows: int, users: int, batch: int = 100_000):
+    Base.metadata.create_all(bind=engine)
+    for index in INDEXES:
+        index.drop(bind=engine)
+    rnd = random.Random(1)
+    start = datetime(2024, 1, 1)
+    statuses = list(TaskStatus)
+    with engine.begin() as conn:
+        for offset in range(0, rows, batch):
+            conn.execute(Task.__table__.insert(), [{
+                'title': f'task {i}',
+                'description': '',
+                'creator': 1,
+                'assigned_to': rnd.randint(1, users),
+                'status': rnd.choice(statuses).name,
+                'archived': rnd.random() < 0.05,
+                'due_date': start + timedelta(hours=rnd.randint(0, 24 * 365)),
+                'created_at': start + timedelta(seconds=i),
+            } for i in range(offset, min(offset + batch, rows))])
+            print(f'\r  inserted {min(offset + batch, rows):,} rows', end='', flush=True)
+    print()
+
+
+def legacy(db, filters: dict, offset: int, limit: int = 50):
+    query = db.query(Task).filter(Task.archived == False)
+    for name, value in filters.items():
+        query = query.filter(getattr(Task, name) == value)
+    return query.order_by(Task.created_at.desc()).offset(offset).limit(limit).all()
+
+
+def by_offset(db, filters: dict, offset: int, limit: int = 50):
+    return task_service.list_tasks(db, limit=limit, offset=offset, **filters)
+
+
+def median_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        page = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    assert page, 'empty page'
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--legacy-repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f'Populating {args.rows:,} tasks')
+    started = time.perf_counter()
+    populate(args.rows, args.users)
+    print(f'  {time.perf_counter() - started:.1f}s')
+
+    views = [('all', {}), ('one assignee', {'assigned_to': 7}), ('one status', {'status': 'open'})]
+    depths = [0.0, 0.5, 0.99]
+    db = SessionLocal()
+    try:
+        # Offsets and the matching keyset cursors for each view and depth
+        plan = []
+        for name, filters in views:
+            query = db.query(Task.id).filter(Task.archived == False)
+            for column, value in filters.items():
+                query = query.filter(getattr(Task, column) == value)
+            ids = [task_id for (task_id,) in query.order_by(Task.id.desc())]
+            for depth in depths:
+                offset = int(depth * (len(ids) - 50))
+                before_id = ids[offset - 1] if offset else None
+                plan.append((name, filters, depth, offset, before_id))
+
+        old = [median_ms(lambda: legacy(db, f, o), args.legacy_repeat) for _, f, _, o, _ in plan]
+        started = time.perf_counter()
+        for index in INDEXES:
+            index.create(bind=engine)
+        print(f'Built {len(INDEXES)} task indexes in {time.perf_counter() - started:.1f}s')
+        offset_ms = [median_ms(lambda: by_offset(db, f, o), args.repeat) for _, f, _, o, _ in plan]
+        keyset_ms = [median_ms(lambda: task_service.list_tasks(db, limit=50, before_id=b, **f), args.repeat)
+                     for _, f, _, _, b in plan]
+    finally:
+        db.close()
+
+    print(f'\n{"view":<14} {"depth":>6} {"offset":>9} {"legacy ms":>11} {"offset ms":>11} {"keyset ms":>11}')
+    for (name, _, depth, offset, _), a, b, c in zip(plan, old, offset_ms, keyset_ms):
+        print(f'{name:<14} {depth:>6.0%} {offset:>9,} {a:>11.2f} {b:>11.2f} {c:>11.3f}')
+
+
+if __name__ == '__main__':
+    main()
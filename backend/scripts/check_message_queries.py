@@ -0,0 +1,93 @@
+"""Check that rendering a page of messages costs a bounded number of queries.
+
+Stores --messages messages from as many different senders in a scratch
+SQLite file, then counts the SQL statements issued by message listing
+(newest page and an older page), history replay and the archive export's
+username lookup. Exits non-zero if any path needs more than its budget,
+e.g. if a per-message sender lookup (N+1) comes back.
+
+Run from backend/:  python -m scripts.check_message_queries
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = f'sqlite:///{tempfile.mkdtemp()}/check.db'
+
+from sqlalchemy import event  # noqa: E402
+
+from app.db import Base, SessionLocal, engine  # noqa: E402
+from app.models import Message, User  # noqa: E402
+from app.services import message_service  # noqa: E402
+from app.services.user_service import get_usernames, username_cache  # noqa: E402
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def measure(self, fn, *args, **kwargs) -> int:
+        before = self.count
+        fn(*args, **kwargs)
+        return self.count - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=100)
+    args = parser.parse_args()
+    n = args.messages
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(),
+                     [{'id': i, 'username': f'user{i}', 'password_hash': 'x'} for i in range(1, n + 1)])
+        conn.execute(Message.__table__.insert(),
+                     [{'sender': i % n + 1, 'content': f'message {i}', 'org_id': 'general'}
+                      for i in range(2 * n)])
+
+    counter = QueryCounter()
+    db = SessionLocal()
+
+    def older_page():
+        msgs = message_service.get_messages(db, room='general', limit=n, before_id=n + 1)
+        message_service.to_payloads(db, msgs)
+
+    def replay():
+        msgs = message_service.get_messages_after(db, 'general', 0, n)
+        message_service.to_payloads(db, msgs)
+
+    def archive():
+        get_usernames(db, (m.sender for m in db.query(Message).limit(n)))
+
+    # (name, function, allowed statements)
+    checks = [
+        ('older page, cold username cache', older_page, 2),
+        ('older page, warm username cache', older_page, 1),
+        ('newest page, cold', lambda: message_service.get_latest_page(db, 'general', min(n, 100)), 2),
+        ('newest page, cached', lambda: message_service.get_latest_page(db, 'general', min(n, 100)), 0),
+        ('replay from DB', replay, 1),
+        ('archive usernames', archive, 1),
+    ]
+    failed = False
+    try:
+        for name, fn, budget in checks:
+            if name.endswith('cold username cache'):
+                username_cache.clear()
+            queries = counter.measure(fn)
+            ok = queries <= budget
+            failed |= not ok
+            print(f'{"ok  " if ok else "FAIL"} {name:<34} {queries} queries (budget {budget})')
+    finally:
+        db.close()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Local stand-in for a Web Push service (FCM, Mozilla autopush, ...).
+
+Accepts ``POST /push/<token>`` like a push service does: checks for a VAPID
+``Authorization`` header and an ``aes128gcm`` body, waits ``--latency`` ms
+and answers 201. Tokens starting with ``gone-`` get 410 and ``missing-``
+404 (expired subscriptions), ``slow-`` never answer in time.
+``GET /stats`` reports requests, statuses and the number of TCP connections
+used, ``GET /last/<token>`` the last body received for a token (base64).
+
+Point subscription endpoints at it to try pushes without a browser.
+
+Run from backend/:  python -m scripts.push_standin --port 8765
+"""
+import argparse
+import asyncio
+import base64
+from collections import Counter
+
+from aiohttp import web
+
+
+def make_app(latency: float = 0.02) -> web.Application:
+    stats = Counter()
+    connections = set()
+    last: dict[str, bytes] = {}
+
+    async def push(request: web.Request) -> web.Response:
+        token = request.match_info['token']
+        connections.add(request.transport.get_extra_info('peername'))
+        stats['requests'] += 1
+        body = await request.read()
+        if not request.headers.get('Authorization', '').startswith('vapid t='):
+            status = 401
+        elif request.headers.get('Content-Encoding') != 'aes128gcm' or not body:
+            status = 400
+        elif token.startswith('gone-'):
+            status = 410
+        elif token.startswith('missing-'):
+            status = 404
+        else:
+            if token.startswith('slow-'):
+                await asyncio.sleep(3600)
+            await asyncio.sleep(latency)
+            status = 201
+            last[token] = body
+        stats[str(status)] += 1
+        return web.Response(status=status)
+
+    async def get_stats(request: web.Request) -> web.Response:
+        return web.json_response({**stats, 'connections': len(connections)})
+
+    async def get_last(request: web.Request) -> web.Response:
+        body = last.get(request.match_info['token'])
+        if body is None:
+            raise web.HTTPNotFound()
+        return web.Response(text=base64.b64encode(body).decode())
+
+    app = web.Application()
+    app.add_routes([web.post('/push/{token}', push), web.get('/stats', get_stats),
+                    web.get('/last/{token}', get_last)])
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=20, help='ms before answering')
+    args = parser.parse_args()
+    web.run_app(make_app(args.latency / 1000), host=args.host, port=args.port,
+                backlog=4096, print=lambda *_: print(f'Push stand-in on http://{args.host}:{args.port}/push/<token>'))
+
+
+if __name__ == '__main__':
+    main()
@@ -174,6 +174,15 @@ export const messagesApi = {
   },
 };
 
+// Presence API
+export const presenceApi = {
+  async online() {
+    const response = await apiRequest('/presence');
+    if (response.ok) return await response.json();
+    return [];
+  },
+};
+
 // Files API
 export const filesApi = {
   async upload(file, messageId = null, taskId = null) {
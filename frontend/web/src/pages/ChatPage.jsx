@@ -1,6 +1,6 @@
 import { useEffect, useState, useRef, useCallback } from 'react';
 import { useOutletContext } from 'react-router-dom';
-import { messagesApi } from '../api';
+import { messagesApi, presenceApi } from '../api';
 import FileUpload from '../components/FileUpload';
 import AttachmentList from '../components/AttachmentList';
 import './Chat.css';
@@ -56,6 +56,7 @@ export default function ChatPage() {
   const inputRef = useRef();
   const endRef = useRef();
   const typingTimeoutRef = useRef(null);
+  const lastIdRef = useRef(0);
 
   // Load messages on mount
   useEffect(() => {
@@ -63,59 +64,100 @@ export default function ChatPage() {
       setMessages(msgs);
       setLoading(false);
     });
+    presenceApi.online().then(users => {
+      setOnlineUsers(users.map(u => ({ id: u.user_id, username: u.username })));
+    });
   }, []);
 
   // Listen for Socket.IO events
   useEffect(() => {
     if (!socket) return;
 
-    socket.emit('join_room', { room: 'general' });
+    // Rejoin after every reconnect; the server replays what we missed since the last message we have
+    const joinRoom = () => {
+      socket.emit('join_room', { room: 'general', last_seen_id: lastIdRef.current || undefined });
+    };
+    joinRoom();
+
+    const mergeMessages = (prev, incoming) => {
+      const known = new Set(prev.map(m => m.id));
+      const fresh = incoming.filter(m => !known.has(m.id));
+      return fresh.length ? [...prev, ...fresh].sort((a, b) => a.id - b.id) : prev;
+    };
 
     const handleNewMessage = (m) => {
-      setMessages(prev => [...prev, m]);
+      setMessages(prev => mergeMessages(prev, [m]));
       // Remove sender from typing list
       setTypingUsers(prev => prev.filter(u => u !== m.sender_username));
     };
 
-    const handleUserTyping = (data) => {
-      const username = data.username || `User ${data.user_id}`;
+    const handleRoomReplay = (data) => {
+      if (data.room !== 'general') return;
+      if (data.truncated) {
+        // Offline too long to replay everything: start over from the latest page
+        messagesApi.list('general', 50).then(setMessages);
+        return;
+      }
+      setMessages(prev => mergeMessages(prev, data.messages));
+    };
+
+    const handleMessageDeleted = (data) => {
+      setMessages(prev => prev.filter(m => m.id !== data.id));
+    };
+
+    // Aggregated per room by the server: { room, typing: [...], stopped: [...] }
+    const handleRoomTyping = (data) => {
+      if (data.room !== 'general') return;
+      const others = (list) => list.filter(u => u.user_id !== user?.id).map(u => u.username);
+      const stopped = new Set(others(data.stopped));
       setTypingUsers(prev => {
-        if (!prev.includes(username)) {
-          return [...prev, username];
+        const next = prev.filter(name => !stopped.has(name));
+        for (const name of others(data.typing)) {
+          if (!next.includes(name)) next.push(name);
         }
-        return prev;
+        return next;
       });
-      // Auto-remove after 3 seconds
-      setTimeout(() => {
-        setTypingUsers(prev => prev.filter(u => u !== username));
-      }, 3000);
     };
 
-    const handleUserOnline = (data) => {
+    // Presence arrives as periodic diffs: { online: [{user_id, username}], offline: [user_id] }
+    const handlePresenceDiff = (diff) => {
       setOnlineUsers(prev => {
-        if (!prev.find(u => u.id === data.user_id)) {
-          return [...prev, { id: data.user_id, username: data.username }];
+        const gone = new Set(diff.offline);
+        const next = prev.filter(u => !gone.has(u.id));
+        for (const u of diff.online) {
+          if (!next.find(x => x.id === u.user_id)) {
+            next.push({ id: u.user_id, username: u.username });
+          }
         }
-        return prev;
+        return next;
       });
     };
 
-    const handleUserOffline = (data) => {
-      setOnlineUsers(prev => prev.filter(u => u.id !== data.user_id));
-    };
-
+    socket.on('connect', joinRoom);
     socket.on('new_message', handleNewMessage);
-    socket.on('user_typing', handleUserTyping);
-    socket.on('user_online', handleUserOnline);
-    socket.on('user_offline', handleUserOffline);
+    socket.on('room_replay', handleRoomReplay);
+    socket.on('message_deleted', handleMessageDeleted);
+    socket.on('room_typing', handleRoomTyping);
+    socket.on('presence_diff', handlePresenceDiff);
 
     return () => {
+      socket.off('connect', joinRoom);
       socket.off('new_message', handleNewMessage);
-      socket.off('user_typing', handleUserTyping);
-      socket.off('user_online', handleUserOnline);
-      socket.off('user_offline', handleUserOffline);
+      socket.off('room_replay', handleRoomReplay);
+      socket.off('message_deleted', handleMessageDeleted);
+      socket.off('room_typing', handleRoomTyping);
+      socket.off('presence_diff', handlePresenceDiff);
     };
-  }, [socket]);
+  }, [socket, user]);
+
+  useEffect(() => {
+    if (!messages.length) return;
+    lastIdRef.current = messages[messages.length - 1].id;
+    // The open chat is read up to the newest message shown
+    if (socket && !document.hidden) {
+      socket.emit('mark_read', { room: 'general', message_id: lastIdRef.current });
+    }
+  }, [messages, socket]);
 
   // Scroll to bottom on new messages
   useEffect(() => {